@@ -0,0 +1,59 @@
+"""Module containing ActivityResolver for resolving reported activities of time entries with precompiled tables."""
+
+
+class ActivityResolver:
+    """Class ActivityResolver for looking up the resulting activity of a time entry in a single step.
+
+       Tables are compiled once per project from user roles and the (role, activity) -> activity mapping.
+       They only hold the (user, activity) pairs whose activity is overridden, every other pair keeps its activity.
+       Pairs are keyed by names, not integer ids: memberships, HourBuckets rows and time entry records all carry names,
+       records share one string per user and activity (see records.Refs), and strings cache their hash, so a lookup
+       costs the same as with integer keys, while mapping names to ids for every entry would cost an extra lookup.
+
+       activities - list of all activity names
+       calculate_activity - function (set of roles, activity) -> resulting activity, applied while compiling
+       overrides - dictionary {project id: {(user, activity): resulting activity}}
+    """
+
+    def __init__(self, activities, calculate_activity):
+        self.activities = activities
+        self.calculate_activity = calculate_activity
+        self.overrides = {}
+
+    def compile(self, projects):
+        """Compile override tables for RedmineProject objects.
+
+        Users with the same set of roles behave the same, so every distinct set of roles is evaluated only once
+        and shared between projects.
+        """
+        role_set_ids = {}  # frozenset of roles: id
+        role_set_overrides = []  # id: {activity: resulting activity}
+        for project in projects:
+            table = {}
+            for user, set_of_roles in project.user_roles.items():
+                key = frozenset(set_of_roles)
+                role_set_id = role_set_ids.get(key)
+                if role_set_id is None:
+                    role_set_id = role_set_ids[key] = len(role_set_overrides)
+                    role_set_overrides.append(self.compile_role_set(set_of_roles))
+                for activity, resulting_activity in role_set_overrides[role_set_id].items():
+                    table[(user, activity)] = resulting_activity
+            self.overrides[project.project.id] = table
+        return self
+
+    def compile_role_set(self, set_of_roles) -> dict:
+        overrides = {}
+        if set_of_roles:
+            for activity in self.activities:
+                resulting_activity = self.calculate_activity(set_of_roles, activity)
+                if resulting_activity != activity:
+                    overrides[activity] = resulting_activity
+        return overrides
+
+    def project_overrides(self, project_id) -> dict:
+        """Get {(user, activity): resulting activity} of the project, resolve with .get((user, activity), activity)."""
+        return self.overrides.get(project_id, {})
+
+    def resolve(self, project_id, user, activity) -> str:
+        """Get the resulting activity of a time entry of the user in the project."""
+        return self.overrides.get(project_id, {}).get((user, activity), activity)
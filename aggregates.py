@@ -0,0 +1,115 @@
+"""Module containing HourBuckets, hours pre-aggregated by day, week, month and year in the RedmineCache database.
+
+Every bucket holds the hours per (project, issue, user, activity) of its days. Buckets nest: a week is one of the
+days 1-7, 8-14, 15-21 and 22-end of a month, so any time interval is covered by a few whole buckets.
+"""
+
+import json
+from collections import defaultdict
+from datetime import date, timedelta
+
+LEVELS = ('year', 'month', 'week', 'day')  # From the largest buckets to the smallest
+
+
+def bucket_start(level, day) -> date:
+    """First day of the bucket of the level containing day."""
+    if level == 'year':
+        return day.replace(month=1, day=1)
+    if level == 'month':
+        return day.replace(day=1)
+    if level == 'week':
+        return day.replace(day=min(day.day - 1, 21) // 7 * 7 + 1)
+    return day
+
+
+def bucket_end(level, start) -> date:
+    """Last day of the bucket of the level starting at start."""
+    if level == 'year':
+        return start.replace(month=12, day=31)
+    next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+    if level == 'month' or (level == 'week' and start.day == 22):
+        return next_month - timedelta(days=1)
+    if level == 'week':
+        return start + timedelta(days=6)
+    return start
+
+
+def cover(from_date, to_date) -> list:
+    """Split [from_date, to_date] into the fewest (level, start) buckets, taking the largest bucket that fits."""
+    buckets = []
+    day = from_date
+    while day <= to_date:
+        for level in LEVELS:
+            if bucket_start(level, day) == day and bucket_end(level, day) <= to_date:
+                buckets.append((level, day))
+                day = bucket_end(level, day) + timedelta(days=1)
+                break
+    return buckets
+
+
+class HourBuckets:
+    """Class HourBuckets for answering "hours spent in [from_date, to_date]" without reading time entries.
+
+       Buckets are brought up to date by update() from the days RedmineCache marks as changed.
+       last_entry of a bucket row is the most recent of its time entries as 'spent_on:id', so rows can be ordered
+       like the time entries Redmine returns.
+
+       cache - RedmineCache whose database holds the time entries and the buckets
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.db = cache.db
+
+    def update(self):
+        """Recompute the buckets of every changed day and the larger buckets containing it."""
+        with self.cache.transaction():  # Days marked by a concurrent sync are not lost
+            days = sorted(date.fromisoformat(row[0]) for row in self.db.execute('SELECT day FROM dirty_days'))
+            if not days:
+                return
+            for day in days:
+                self.update_day(day)
+            # Weeks from days, months from weeks, years from months
+            for lower, level in zip(LEVELS[:0:-1], LEVELS[-2::-1]):
+                for start in sorted({bucket_start(level, day) for day in days}):
+                    self.roll_up(level, start, lower)
+            self.db.execute('DELETE FROM dirty_days')
+
+    def update_day(self, day):
+        hours = defaultdict(float)
+        last_entry = {}
+        rows = self.db.execute('SELECT id, data FROM time_entries WHERE spent_on = ? ORDER BY id', (str(day),))
+        for entry_id, data in rows:
+            entry = json.loads(data)
+            key = (entry['project']['id'], entry.get('issue', {}).get('id', 0),
+                   entry['user']['name'], entry['activity']['name'])
+            hours[key] += entry['hours']
+            last_entry[key] = '{}:{:010}'.format(day, entry_id)
+        self.db.execute("DELETE FROM hour_buckets WHERE level = 'day' AND start = ?", (str(day),))
+        self.db.executemany('INSERT INTO hour_buckets VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                            (('day', str(day), *key, value, last_entry[key]) for key, value in hours.items()))
+
+    def roll_up(self, level, start, lower):
+        """Recompute a bucket of the level by adding up the buckets of the lower level inside it."""
+        self.db.execute('DELETE FROM hour_buckets WHERE level = ? AND start = ?', (level, str(start)))
+        self.db.execute('INSERT INTO hour_buckets '
+                        'SELECT ?, ?, project_id, issue_id, user, activity, SUM(hours), MAX(last_entry) '
+                        'FROM hour_buckets WHERE level = ? AND start BETWEEN ? AND ? '
+                        'GROUP BY project_id, issue_id, user, activity',
+                        (level, str(start), lower, str(start), str(bucket_end(level, start))))
+
+    def hours(self, from_date, to_date) -> list:
+        """Get (project id, issue id, user, activity, hours) spent in [from_date, to_date].
+
+        Issue id is 0 for time not spent on an issue. Rows are ordered by their most recent time entry, newest first,
+        so users appear in the order they have when time entries are added one by one.
+        """
+        buckets = cover(from_date, to_date)
+        if not buckets:
+            return []
+        condition = ' OR '.join(['(level = ? AND start = ?)'] * len(buckets))
+        params = [str(value) for bucket in buckets for value in bucket]
+        rows = self.db.execute('SELECT project_id, issue_id, user, activity, SUM(hours), MAX(last_entry) AS last '
+                               'FROM hour_buckets WHERE ' + condition + ' '
+                               'GROUP BY project_id, issue_id, user, activity ORDER BY last DESC', params)
+        return [row[:5] for row in rows]
@@ -0,0 +1,216 @@
+"""Module containing AsyncRedmineManager, a RedmineManager fetching and aggregating concurrently with asyncio.
+
+Requires aiohttp. Time entries and issues of several projects are requested at the same time, at most FETCH_WORKERS
+requests at once, and every page is aggregated as soon as it arrives while the next pages are in flight.
+Projects go into the report in order, each as soon as it and the projects before it are complete.
+"""
+
+import asyncio
+import json
+import ssl
+import time
+from collections import defaultdict, deque
+import aiohttp
+try:
+    from local_settings import *
+except ImportError:
+    from settings import *
+import instrumentation
+from issue_tree import IssueTree
+from main import add_issue_time, add_issues_title, add_project_table, add_projects_title, add_title
+from records import decode_issues, decode_memberships, decode_projects
+from redmine_manager import RedmineManager, RedmineProject
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)  # Answers worth another attempt, like in PooledEngine
+
+
+class AsyncRedmineManager(RedmineManager):
+    """Class AsyncRedmineManager for gathering the data of a report with non-blocking requests.
+
+       Reuses the aggregation of RedmineManager (resolver, walk, tables), the cache and the 'numpy' backend are not used.
+
+       session - aiohttp.ClientSession opened by connect()
+       semaphore - limits the requests in flight for the whole manager to workers
+       timeout - seconds a request may take before it is retried
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.url = None
+        self.session = None
+        self.semaphore = None
+        self.timeout = FETCH_TIMEOUT
+
+    async def connect(self, url=REDMINE_URL, api_key=REDMINE_KEY, workers=FETCH_WORKERS, timeout=FETCH_TIMEOUT):
+        """Open the HTTP session, in the event loop the manager is used in."""
+        verify = False if SUPPRESS_WARNINGS else ssl.create_default_context(cafile=CERT_PATH or None)
+        self.url = url.rstrip('/')
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(self.workers)
+        self.session = aiohttp.ClientSession(headers={'X-Redmine-API-Key': api_key},
+                                             connector=aiohttp.TCPConnector(limit=self.workers, ssl=verify),
+                                             timeout=aiohttp.ClientTimeout(total=timeout))
+        return self
+
+    async def close(self):
+        await self.session.close()
+
+    async def request(self, path, **params) -> dict:
+        """Get a Redmine JSON resource. 429, 5xx and timeouts are retried FETCH_RETRIES times with backoff."""
+        url = self.url + path
+        params = {key: str(value) for key, value in params.items()}
+        for attempt in range(FETCH_RETRIES + 1):
+            last_attempt = attempt == FETCH_RETRIES
+            async with self.semaphore:
+                time_point = time.perf_counter()
+                try:
+                    async with self.session.get(url, params=params) as response:
+                        if response.status not in RETRY_STATUSES or last_attempt:
+                            response.raise_for_status()
+                            body = await response.read()
+                            instrumentation.record_request(str(response.url), len(body),
+                                                           time.perf_counter() - time_point)
+                            return json.loads(body)
+                except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+                    if last_attempt:
+                        raise
+            await asyncio.sleep(FETCH_BACKOFF * 2 ** attempt)  # Outside the semaphore, other requests go on
+
+    async def pages(self, path, container, decode=None, **params):
+        """Yield the pages of a Redmine resource list in order, decoded.
+
+        Up to workers further pages are requested while a page is being processed.
+        """
+        decode = decode or list
+        first = await self.request(path, **dict(params, limit=FETCH_PAGE_SIZE, offset=0))
+        yield decode(first[container])
+        if first.get('total_count') is None or not first[container]:  # Not paginated or empty
+            return
+        limit = first.get('limit') or len(first[container])  # Redmine may cap the page size below the requested one
+        offsets = iter(range(limit, first['total_count'], limit))
+        pending = deque()
+
+        def submit():
+            offset = next(offsets, None)
+            if offset is not None:
+                pending.append(asyncio.ensure_future(self.request(path, **dict(params, limit=limit, offset=offset))))
+
+        for _ in range(self.workers):
+            submit()
+        try:
+            while pending:
+                page = await pending.popleft()
+                submit()
+                yield decode(page[container])
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch_list(self, path, container, decode=None, **params) -> list:
+        """Get all pages of a Redmine resource list as JSON dictionaries, or as records if decode is given."""
+        results = []
+        async for page in self.pages(path, container, decode, **params):
+            results.extend(page)
+        return results
+
+    async def load_reference(self):
+        """Get activities, roles, projects and memberships, like get_roles and get_projects."""
+        activities, roles, projects = await asyncio.gather(
+            self.fetch_list('/enumerations/time_entry_activities.json', 'time_entry_activities'),
+            self.fetch_list('/roles.json', 'roles'),
+            self.fetch_list('/projects.json', 'projects', decode=decode_projects))
+        self.activities = [activity['name'] for activity in activities]
+        self.roles = [role['name'] for role in roles]
+        self.apply_activity_settings()
+        memberships = await asyncio.gather(*(self.fetch_list('/projects/{}/memberships.json'.format(project.id),
+                                                             'memberships', decode=decode_memberships)
+                                             for project in projects))
+        for project, project_memberships in zip(projects, memberships):
+            self.projects.append(RedmineProject(project))
+            self.projects[-1].user_roles = dict(project_memberships)
+        self.compile_resolver()
+
+    async def gather_project(self, project, depth=ISSUE_TREE_DEPTH) -> RedmineProject:
+        """Fetch time entries and issues of the project at the same time and aggregate them into its tables.
+
+        Time spent on the project itself is added up page by page, time spent on issues waits for the issue tree.
+        """
+        interval = {'from': self.from_date, 'to': self.to_date}
+        issues = asyncio.ensure_future(self.fetch_list('/issues.json', 'issues', decode=decode_issues,
+                                                       project_id=project.project.id,
+                                                       subproject_id='!*',  # Not in a subproject
+                                                       status_id='*'))  # Get issues in any status
+        overrides = self.resolver.project_overrides(project.project.id)
+        issue_entries = defaultdict(list)
+        try:
+            async for page in self.pages('/time_entries.json', 'time_entries', decode=self.time_entry_records,
+                                         project_id=project.project.id, subproject_id='!*', **interval):
+                for entry in page:
+                    if hasattr(entry, 'issue'):
+                        issue_entries[entry.issue.id].append(entry)
+                    else:
+                        user, activity = entry.user.name, entry.activity.name
+                        project.time_entries[user][overrides.get((user, activity), activity)] += entry.hours
+            project.issue_tree = IssueTree().build(await issues, depth=depth)
+        finally:
+            issues.cancel()  # Only if fetching time entries failed
+        self.walk(tree=project.issue_tree, project=project, issue_entries=issue_entries)
+        project.issue_tree.aggregate()
+        project.issue_tables_gen = list(self.issue_tables(project))  # Tables are generated while others are fetched
+        return project
+
+    async def gather_projects(self):
+        """Yield the projects in order, each once it is complete. Up to workers projects are gathered at a time."""
+        projects = iter(self.projects)
+        pending = deque()
+
+        def submit():
+            project = next(projects, None)
+            if project is not None:
+                pending.append(asyncio.ensure_future(self.gather_project(project)))
+
+        for _ in range(self.workers):
+            submit()
+        try:
+            while pending:
+                project = await pending.popleft()
+                submit()
+                yield project
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+async def write_report(report, rmman):
+    """Write the report like main.write_report, adding the table of every project as soon as it is complete.
+
+    Issue sections follow the tables of all projects, their tables are ready by then.
+    """
+    add_title(report, rmman)
+    add_projects_title(report, rmman)
+    async for project in rmman.gather_projects():
+        add_project_table(report, rmman, project)
+    add_issues_title(report, rmman)
+    with instrumentation.span('add_issue_time', projects=len(rmman.projects)):
+        for project in rmman.projects:
+            report.start_section(REPORT_MESSAGES['project'][rmman.lang] + ' ' + project.name)
+            add_issue_time(report, project, rmman.lang)
+            if report.streaming:  # Tables of the project are in the report already
+                project.issue_tree = project.issue_tables_gen = None
+    with instrumentation.span(type(report).__name__ + '.build'):
+        report.build()
+
+
+async def generate_report(report, from_date, to_date, url=REDMINE_URL, api_key=REDMINE_KEY) -> AsyncRedmineManager:
+    """Connect, gather the data of [from_date, to_date] and write the report."""
+    rmman = await AsyncRedmineManager().connect(url=url, api_key=api_key)
+    try:
+        rmman.set_time_interval(from_date=from_date, to_date=to_date)
+        with instrumentation.span('load_reference'):
+            await rmman.load_reference()
+        with instrumentation.span('write_report', projects=len(rmman.projects)):
+            await write_report(report, rmman)
+    finally:
+        await rmman.close()
+    return rmman
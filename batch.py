@@ -0,0 +1,167 @@
+"""Batch mode: generate many reports in one run, fetching the data they need from Redmine only once.
+
+Usage: python batch.py specs.json, where specs.json holds a list of report specs, for example
+[{"filename": "march.pdf", "from": "2026-03-01", "to": "2026-03-31"},
+ {"filename": "q1_site.csv", "from": "2026-01-01", "to": "2026-03-31", "projects": ["Site"], "format": "csv",
+  "lang": "RU", "excluded_activities": ["Management"], "role_act_exceptions": [["Developer", "Testing", "Development"]]},
+ {"filename": "lead.pdf", "from": "2026-03-01", "to": "2026-03-31", "users": ["John Smith", "Jane Doe"]}]
+Omitted keys take their values from settings, except filename: it defaults to redmine_report_<from>_<to>_<number>.pdf
+with the number of the spec in the list. The extension of filename is replaced for other formats, like in main.py.
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+try:
+    from local_settings import *
+except ImportError:
+    from settings import *
+from main import create_report, report_filename, write_report
+from redmine_manager import RedmineManager
+
+
+class ReportSpec:
+    """Class ReportSpec describing one report of a batch.
+
+       projects - names, identifiers or ids of the projects included, None for all projects
+       users - names of the users whose time is included, None for all users
+    """
+
+    def __init__(self, filename, from_date, to_date, projects=None, users=None, output_format=OUTPUT_FORMAT,
+                 lang=LANG, excluded_activities=EXCLUDED_ACTIVITIES, role_act_exceptions=ROLE_ACT_EXCEPTIONS):
+        self.filename = filename
+        self.from_date = from_date
+        self.to_date = to_date
+        self.projects = None if projects is None else {str(project) for project in projects}
+        self.users = None if users is None else set(users)
+        self.output_format = output_format
+        self.lang = lang
+        self.excluded_activities = excluded_activities
+        self.role_act_exceptions = role_act_exceptions
+
+    @classmethod
+    def from_dict(cls, spec, number=1):
+        """Create a ReportSpec from a dictionary of JSON values, see the module docstring.
+
+        number - number of the spec in the batch, part of the default filename
+        """
+        to_date = date.fromisoformat(spec['to']) if 'to' in spec else date.today()
+        from_date = date.fromisoformat(spec['from']) if 'from' in spec else to_date - timedelta(days=NUM_DAYS)
+        return cls(filename=spec.get('filename', 'redmine_report_{}_{}_{}.pdf'.format(from_date, to_date, number)),
+                   from_date=from_date,
+                   to_date=to_date,
+                   projects=spec.get('projects'),
+                   users=spec.get('users'),
+                   output_format=spec.get('format', OUTPUT_FORMAT),
+                   lang=spec.get('lang', LANG),
+                   excluded_activities=set(spec.get('excluded_activities', EXCLUDED_ACTIVITIES)),
+                   role_act_exceptions=({(role, activity): resulting for role, activity, resulting
+                                         in spec['role_act_exceptions']}
+                                        if 'role_act_exceptions' in spec else ROLE_ACT_EXCEPTIONS))
+
+    @property
+    def path(self) -> str:
+        """Path the report is written to."""
+        return report_filename(self.filename, self.output_format)
+
+    def includes_project(self, project) -> bool:
+        return self.projects is None or not self.projects.isdisjoint(
+            {project.name, str(project.project.id), getattr(project.project, 'identifier', '')})
+
+    def includes_entry(self, entry) -> bool:
+        return self.from_date <= entry.spent_on <= self.to_date and (self.users is None or entry.user.name in self.users)
+
+
+def merge_intervals(intervals) -> list:
+    """Merge overlapping and adjacent (from_date, to_date) intervals."""
+    merged = []
+    for from_date, to_date in sorted(intervals):
+        if merged and from_date <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], to_date))
+        else:
+            merged.append((from_date, to_date))
+    return merged
+
+
+class Batch:
+    """Class Batch for generating reports of several ReportSpecs from data fetched once.
+
+       rmman - RedmineManager holding roles, activities and the projects of any spec
+       time_entries - time entries of all time intervals of the specs
+       issues - {project id: [(issue id, subject, parent id)]} of the projects of any spec
+    """
+
+    def __init__(self, specs):
+        paths = [spec.path for spec in specs]
+        duplicates = sorted({report_path for report_path in paths if paths.count(report_path) > 1})
+        if duplicates:  # Reports would overwrite each other
+            raise ValueError('Several specs write to ' + ', '.join(duplicates))
+        self.specs = specs
+        self.rmman = None
+        self.time_entries = []
+        self.issues = None
+
+    def fetch(self, rmman):
+        """Fetch everything the specs need through the connected RedmineManager."""
+        rmman.get_roles()
+        rmman.get_projects()
+        rmman.projects = [project for project in rmman.projects
+                          if any(spec.includes_project(project) for spec in self.specs)]
+        self.rmman = rmman
+        for from_date, to_date in merge_intervals((spec.from_date, spec.to_date) for spec in self.specs):
+            rmman.set_time_interval(from_date=from_date, to_date=to_date)
+            self.time_entries.extend(rmman.fetch_time_entries())
+        self.issues = rmman.fetch_issues()
+        return self
+
+    def generate(self, index) -> str:
+        """Generate the report of the spec with the index, return the path of the report."""
+        spec = self.specs[index]
+        rmman = self.rmman.spawn(cache=False)  # All data is at hand
+        rmman.executor = ThreadPoolExecutor(max_workers=rmman.workers)  # Threads are not inherited by forked processes
+        rmman.lang = spec.lang
+        rmman.apply_activity_settings(spec.role_act_exceptions, spec.excluded_activities)
+        rmman.projects = [project for project in rmman.projects if spec.includes_project(project)]
+        rmman.compile_resolver()
+        rmman.set_time_interval(from_date=spec.from_date, to_date=spec.to_date)
+        rmman.get_time_entries(time_entries=[entry for entry in self.time_entries if spec.includes_entry(entry)])
+        rmman.get_project_time()
+        report = create_report(filename=spec.filename, output_format=spec.output_format, lang=rmman.lang)
+        write_report(report, rmman, issues=self.issues)
+        rmman.executor.shutdown()
+        return spec.path
+
+    def generate_all(self, workers=BATCH_WORKERS) -> list:
+        """Generate the reports of all specs in parallel processes sharing the fetched data, return their paths.
+
+        Forked processes inherit the data, so nothing is copied. Where fork is not available, reports are generated
+        one after another.
+        """
+        workers = workers or os.cpu_count()
+        if workers == 1 or len(self.specs) == 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            return [self.generate(index) for index in range(len(self.specs))]
+        global _batch
+        _batch = self
+        with ProcessPoolExecutor(max_workers=min(workers, len(self.specs)),
+                                 mp_context=multiprocessing.get_context('fork')) as executor:
+            return list(executor.map(_generate, range(len(self.specs))))
+
+
+_batch = None  # Batch shared with the forked worker processes
+
+
+def _generate(index):
+    return _batch.generate(index)
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], encoding='utf-8') as spec_file:
+        report_specs = [ReportSpec.from_dict(spec, number) for number, spec in enumerate(json.load(spec_file), 1)]
+    manager = RedmineManager()
+    manager.connect()
+    batch = Batch(report_specs).fetch(manager)
+    for generated in batch.generate_all():
+        print('Report generated: ' + generated)
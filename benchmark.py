@@ -0,0 +1,863 @@
+"""Benchmarks of the report pipeline against a local FakeRedmine server.
+
+Usage: python benchmark.py <benchmark> [options], see python benchmark.py --help.
+python benchmark.py suite runs the full pipeline and the microbenchmarks several times and stores the results
+by git revision, python benchmark.py compare <revision> <revision> compares two stored results.
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import timeit
+import tracemalloc
+from collections import defaultdict
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from functools import partial
+from io import StringIO
+from types import SimpleNamespace
+import instrumentation
+import main
+from fake_redmine import FakeRedmine, generate_data, load_data, record_data, save_data
+from issue_tree import IssueTree
+from redmine_manager import RedmineManager, RedmineProject
+from report import Report
+
+
+def run_pipeline(url, workers=1, bulk=False, from_date=date(2026, 1, 1), to_date=date(2026, 3, 31)) -> RedmineManager:
+    """Run the data gathering part of main.py against url and return the RedmineManager."""
+    rmman = RedmineManager()
+    rmman.connect(url=url, api_key='benchmark', workers=workers)
+    rmman.set_time_interval(from_date=from_date, to_date=to_date)
+    with redirect_stdout(StringIO()):  # Silence progress output
+        rmman.get_roles()
+        rmman.get_projects()
+        if bulk:
+            rmman.get_time_entries()
+        rmman.get_project_time()
+        rmman.get_issues()
+    return rmman
+
+
+def bench_workers(args):
+    """Wall-clock time of the data gathering pipeline depending on the number of fetch workers."""
+    data = generate_data(num_projects=args.projects, issues_per_project=args.issues, num_entries=args.entries)
+    print('{:>8} {:>10} {:>10} {:>8}'.format('workers', 'seconds', 'requests', 'speedup'))
+    baseline = None
+    for workers in args.workers:
+        with FakeRedmine(data, latency=args.latency, separate_process=True) as fake:
+            time_point = timeit.default_timer()
+            run_pipeline(fake.url, workers=workers, bulk=args.bulk)
+            seconds = timeit.default_timer() - time_point
+            baseline = baseline or seconds
+            print('{:>8} {:>10.3f} {:>10} {:>7.1f}x'.format(workers, seconds, fake.request_count, baseline / seconds))
+
+
+def synthetic_issues(num_issues, seed=0) -> list:
+    """(issue_id, subject, parent_id) tuples of a random hierarchy, parents always precede their children."""
+    rnd = random.Random(seed)
+    return [(i, 'Issue {}'.format(i), rnd.randrange(i) if i and rnd.random() < 0.8 else None)
+            for i in range(num_issues)]
+
+
+def bench_tree(args):
+    """Build, traverse, aggregate and print an IssueTree of a synthetic issue hierarchy."""
+    issues = synthetic_issues(args.nodes)
+    timings = {}
+    time_point = timeit.default_timer()
+    tree = IssueTree()
+    for issue_id, subject, parent_id in issues:
+        tree.init_node(issue_id, subject, tree.nodes[parent_id] if parent_id is not None else None)
+    timings['init_node'] = timeit.default_timer() - time_point
+    time_point = timeit.default_timer()
+    tree = IssueTree().build(issues)
+    timings['build'] = timeit.default_timer() - time_point
+    time_point = timeit.default_timer()
+    for node in tree.walk():
+        node.add_data('User', 'Development', 1)
+    timings['walk + add_data'] = timeit.default_timer() - time_point
+    time_point = timeit.default_timer()
+    tree.aggregate()
+    timings['aggregate'] = timeit.default_timer() - time_point
+    time_point = timeit.default_timer()
+    str(tree)
+    timings['str'] = timeit.default_timer() - time_point
+    del tree
+    tracemalloc.start()
+    tree = IssueTree().build(issues)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('{} nodes, {} roots, {} leaves'.format(len(tree.nodes), len(tree.roots), len(tree.leaves)))
+    for label, seconds in timings.items():
+        print('{:>16}: {:.3f} seconds'.format(label, seconds))
+    print('{:>16}: {:.0f} bytes per node'.format('memory', memory / len(tree.nodes)))
+
+
+def synthetic_manager(num_projects=50, num_users=100, seed=0) -> RedmineManager:
+    """RedmineManager with synthetic roles, activities and project memberships, not connected to Redmine."""
+    rnd = random.Random(seed)
+    rmman = RedmineManager()
+    rmman.activities = ['Design', 'Development', 'Testing', 'Management', 'Support', 'Documentation']
+    rmman.roles = ['Manager', 'Developer', 'Reporter', 'Tester']
+    rmman.role_act_map = {(role, activity): activity for role in rmman.roles for activity in rmman.activities}
+    rmman.role_act_map[('Developer', 'Testing')] = 'Development'
+    rmman.role_act_map[('Tester', 'Design')] = 'Testing'
+    rmman.reported_activities = rmman.activities
+    for p in range(num_projects):
+        project = RedmineProject(SimpleNamespace(id=p + 1, name='Project {}'.format(p + 1)))
+        for u in rnd.sample(range(num_users), num_users // 2):
+            project.user_roles['User {}'.format(u)] = set(rnd.sample(rmman.roles, rnd.randint(1, 2)))
+        rmman.projects.append(project)
+    rmman.compile_resolver()
+    return rmman
+
+
+def synthetic_entries(rmman, num_entries, num_users=100, seed=0) -> list:
+    """(project_id, user, activity, spent_on, hours) tuples of random time entries."""
+    rnd = random.Random(seed)
+    users = ['User {}'.format(u) for u in range(num_users)]
+    days = [date(2026, 1, 1) + timedelta(days=d) for d in range(90)]
+    return [(rnd.randint(1, len(rmman.projects)), rnd.choice(users), rnd.choice(rmman.activities), rnd.choice(days),
+             rnd.choice([0.25, 0.5, 1.0, 2.0, 4.0, 8.0])) for _ in range(num_entries)]
+
+
+def synthetic_pages(rmman, entries, page_size=100) -> list:
+    """Pages of JSON time entries as Redmine returns them, from synthetic_entries tuples."""
+    items = [{'id': i + 1,
+              'project': {'id': project_id, 'name': 'Project {}'.format(project_id)},
+              'user': {'id': int(user.split()[1]) + 1, 'name': user},
+              'activity': {'id': rmman.activities.index(activity) + 1, 'name': activity},
+              'hours': hours,
+              'spent_on': str(spent_on)}
+             for i, (project_id, user, activity, spent_on, hours) in enumerate(entries)]
+    return [items[start:start + page_size] for start in range(0, len(items), page_size)]
+
+
+def bench_aggregation(args):
+    """Decode JSON pages of synthetic time entries and sum them per project with the dict and the NumPy backend.
+
+    Memory is traced in a separate run: kept is what stays of the time entries (records and index or columns) and the
+    tables, peak includes the temporary arrays of the NumPy group-by. The JSON pages themselves are not counted.
+    """
+    from columnar import TimeEntryColumns
+    rmman = synthetic_manager()
+    pages = synthetic_pages(rmman, synthetic_entries(rmman, args.entries))
+
+    def run_dict():  # As RedmineManager.get_time_entries and get_project_time
+        project_entries = defaultdict(list)
+        for page in pages:
+            for entry in rmman.time_entry_records(page):
+                project_entries[entry.project.id].append(entry)
+        tables = defaultdict(partial(defaultdict, partial(defaultdict, int)))
+        for project_id, entries in project_entries.items():
+            overrides = rmman.resolver.project_overrides(project_id)
+            for entry in entries:
+                user, activity = entry.user.name, entry.activity.name
+                tables[project_id][user][overrides.get((user, activity), activity)] += entry.hours
+        return tables, project_entries
+
+    def run_numpy():
+        columns = TimeEntryColumns()
+        columns.extend([decoded for page in pages for decoded in columns.decode_page(page)])
+        activities = columns.resolve_activities(rmman.resolver.resolve)
+        return columns.group_sum(columns.project.astype('int64'), activities), columns
+
+    results = {}
+    print('{:>8} {:>10} {:>16} {:>16}'.format('backend', 'seconds', 'kept bytes/entry', 'peak bytes/entry'))
+    for label, run in (('dict', run_dict), ('numpy', run_numpy)):
+        time_point = timeit.default_timer()
+        results[label] = run()[0]
+        seconds = timeit.default_timer() - time_point
+        gc.collect()
+        tracemalloc.start()
+        kept = run()
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del kept
+        print('{:>8} {:>10.3f} {:>16.0f} {:>16.0f}'.format(label, seconds, size / args.entries, peak / args.entries))
+    equal = all(abs(results['dict'][project_id][user][activity] - hours) < 1e-6
+                for project_id, table in results['numpy'].items()
+                for user, user_store in table.items()
+                for activity, hours in user_store.items())
+    print('{} time entries, results equal: {}'.format(args.entries, equal))
+
+
+def bench_resolver(args):
+    """Resolve activities of a synthetic stream of time entries with calculate_activity and ActivityResolver."""
+    rmman = synthetic_manager()
+    entries = synthetic_entries(rmman, args.entries)
+    projects = {project.project.id: project for project in rmman.projects}
+
+    time_point = timeit.default_timer()
+    rmman.compile_resolver()
+    compile_seconds = timeit.default_timer() - time_point
+
+    # Per entry calculation, as RedmineManager did before the resolver
+    time_point = timeit.default_timer()
+    calculated = []
+    for project_id, user, activity, _, _ in entries:
+        project = projects[project_id]
+        if user in project.user_roles:
+            calculated.append(rmman.calculate_activity(project.user_roles[user], activity))
+        else:
+            calculated.append(activity)
+    calculate_seconds = timeit.default_timer() - time_point
+
+    time_point = timeit.default_timer()
+    resolved = []
+    for project_id, user, activity, _, _ in entries:
+        resolved.append(rmman.resolver.project_overrides(project_id).get((user, activity), activity))
+    resolve_seconds = timeit.default_timer() - time_point
+
+    print('{} time entries, results equal: {}'.format(len(entries), calculated == resolved))
+    print('{:>20}: {:.3f} seconds'.format('compile', compile_seconds))
+    print('{:>20}: {:.3f} seconds'.format('calculate_activity', calculate_seconds))
+    print('{:>20}: {:.3f} seconds'.format('resolver lookup', resolve_seconds))
+
+
+def synthetic_table(rnd, label, num_users=8) -> list:
+    """Report table as produced by RedmineManager.gen_report_table."""
+    activities = ['Design', 'Development', 'Testing', 'Management', 'Support']
+    rows = [['User {}'.format(u)] + [rnd.choice([0, 0.5, 1.5, 2.25, 8]) for _ in activities] for u in range(num_users)]
+    return [[label, *activities], *rows, ['Total: ', *(sum(column) for column in list(zip(*rows))[1:])]]
+
+
+def fill_report(report, num_tables, tables_per_project=100):
+    """Add synthetic issue tables to report, grouped into projects of tables_per_project tables."""
+    rnd = random.Random(0)
+    report.add_text(text='Redmine', header=1, space_after=0.05)
+    for i in range(num_tables):
+        if i % tables_per_project == 0:
+            title = 'Project {}'.format(i // tables_per_project + 1)
+            report.start_section(title)
+            report.add_text(text=title, header=2, space_after=0.1)
+        report.add_header('Issue {}'.format(i))
+        report.add_table(synthetic_table(rnd, '#{}'.format(i)))
+        report.add_space()
+    report.build()
+
+
+def write_report(filename, num_tables, stream, connection):
+    """Write a synthetic report and send (seconds, peak RSS growth in bytes, file size) through connection."""
+    import resource  # Unix only, like fork used by bench_report
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    time_point = timeit.default_timer()
+    report = Report()
+    report.create(filename=filename, stream=stream)
+    fill_report(report, num_tables)
+    seconds = timeit.default_timer() - time_point
+    rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * 1024  # ru_maxrss is in KiB
+    connection.send((seconds, rss_growth, os.path.getsize(filename)))
+
+
+def bench_report(args):
+    """Peak memory and throughput of writing a synthetic report with and without streaming."""
+    print('{:>8} {:>8} {:>10} {:>12} {:>12} {:>10}'.format('mode', 'tables', 'seconds', 'tables/sec',
+                                                           'peak RSS MB', 'file MB'))
+    context = multiprocessing.get_context('fork')  # Every run in a fresh process, so peak RSS is its own
+    with tempfile.TemporaryDirectory() as directory:
+        for num_tables in args.tables:
+            for stream in (False, True):
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=write_report,
+                                          args=(os.path.join(directory, 'report.pdf'), num_tables, stream, sender))
+                process.start()
+                seconds, rss_growth, size = receiver.recv()
+                process.join()
+                print('{:>8} {:>8} {:>10.2f} {:>12.0f} {:>12.1f} {:>10.1f}'.format(
+                    'stream' if stream else 'list', num_tables, seconds, num_tables / seconds, rss_growth / 1e6,
+                    size / 1e6))
+
+
+def bench_render(args):
+    """Throughput of rendering a synthetic report depending on the number of render processes."""
+    from pypdf import PdfReader
+    from report_pool import ParallelReport
+    print('{} CPU cores'.format(os.cpu_count()))
+    print('{:>8} {:>10} {:>12} {:>8} {:>8}'.format('workers', 'seconds', 'tables/sec', 'pages', 'speedup'))
+    baseline = None
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'report.pdf')
+        for workers in args.workers:
+            report = ParallelReport(workers=workers) if workers > 1 else Report()
+            time_point = timeit.default_timer()
+            report.create(filename=filename)
+            fill_report(report, args.tables, args.tables_per_project)
+            seconds = timeit.default_timer() - time_point
+            baseline = baseline or seconds
+            pages = len(PdfReader(filename).pages)
+            print('{:>8} {:>10.2f} {:>12.0f} {:>8} {:>7.1f}x'.format(workers, seconds, args.tables / seconds, pages,
+                                                                   baseline / seconds))
+
+
+def import_seconds(module) -> float:
+    """Time of importing module in a fresh interpreter, not counting the interpreter startup."""
+    seconds = []
+    for code in ('pass', 'import ' + module):
+        time_point = timeit.default_timer()
+        subprocess.run([sys.executable, '-c', code], check=True)
+        seconds.append(timeit.default_timer() - time_point)
+    return seconds[1] - seconds[0]
+
+
+def bench_export(args):
+    """Time of writing a synthetic report as PDF and in the machine-readable formats."""
+    from exporters import EXPORTERS
+    writers = [('pdf', Report, 'report')] + [(extension, exporter, 'exporters')
+                                             for extension, exporter in EXPORTERS.items()]
+    print('{:>8} {:>10} {:>12} {:>10} {:>14}'.format('format', 'seconds', 'tables/sec', 'file MB', 'import seconds'))
+    with tempfile.TemporaryDirectory() as directory:
+        for extension, writer, module in writers:
+            filename = os.path.join(directory, 'report.' + extension)
+            report = writer()
+            time_point = timeit.default_timer()
+            report.create(filename=filename)
+            fill_report(report, args.tables)
+            seconds = timeit.default_timer() - time_point
+            print('{:>8} {:>10.2f} {:>12.0f} {:>10.1f} {:>14.3f}'.format(
+                extension, seconds, args.tables / seconds, os.path.getsize(filename) / 1e6, import_seconds(module)))
+
+
+def time_sums(cache, buckets, intervals) -> tuple:
+    """Sum hours of every interval from raw time entries and from buckets.
+
+    Returns (seconds of raw sums, seconds of bucket sums).
+    """
+    raw_seconds = bucket_seconds = 0
+    for from_date, to_date in intervals:
+        time_point = timeit.default_timer()
+        raw = defaultdict(float)
+        for entry in cache.time_entries(from_date, to_date):
+            raw[(entry['project']['id'], entry.get('issue', {}).get('id', 0),
+                 entry['user']['name'], entry['activity']['name'])] += entry['hours']
+        raw_seconds += timeit.default_timer() - time_point
+        time_point = timeit.default_timer()
+        buckets.hours(from_date, to_date)
+        bucket_seconds += timeit.default_timer() - time_point
+    return raw_seconds, bucket_seconds
+
+
+def bench_buckets(args):
+    """Speed of summing hours of random time intervals from HourBuckets and from raw time entries.
+
+    Their correctness is checked by test_aggregates.py.
+    """
+    from aggregates import HourBuckets
+    from cache import RedmineCache
+    first_day = date(2027, 1, 1)
+    data = generate_data(num_projects=args.projects, issues_per_project=args.issues, num_entries=args.entries,
+                         from_date=first_day, num_days=args.days)
+    cache = RedmineCache(SimpleNamespace(url='benchmark'), path=':memory:')
+    with cache.transaction():
+        cache.store_time_entries(data['time_entries'])
+    buckets = HourBuckets(cache)
+    time_point = timeit.default_timer()
+    buckets.update()
+    build_seconds = timeit.default_timer() - time_point
+
+    rnd = random.Random(0)
+    intervals = [sorted(first_day + timedelta(days=rnd.randrange(args.days)) for _ in range(2))
+                 for _ in range(args.intervals)]
+    raw_seconds, bucket_seconds = time_sums(cache, buckets, intervals)
+
+    changed = rnd.sample(data['time_entries'][:args.changes * 10], args.changes)  # Recent, like in a daily sync
+    for entry in changed:
+        entry['hours'] += 1
+    time_point = timeit.default_timer()
+    with cache.transaction():
+        cache.store_time_entries(changed)
+    buckets.update()
+    incremental_seconds = timeit.default_timer() - time_point
+
+    print('{} time entries over {} days, {} intervals'.format(len(data['time_entries']), args.days, len(intervals)))
+    print('{:>24}: {:.3f} seconds'.format('build all buckets', build_seconds))
+    print('{:>24}: {:.3f} seconds'.format('update {} changed'.format(args.changes), incremental_seconds))
+    print('{:>24}: {:.4f} seconds per interval'.format('raw time entries', raw_seconds / len(intervals)))
+    print('{:>24}: {:.4f} seconds per interval'.format('buckets', bucket_seconds / len(intervals)))
+
+
+def bench_batch(args):
+    """Time of generating a batch of reports one by one (like separate main.py runs) and with batch.py."""
+    from batch import Batch, ReportSpec
+    data = generate_data(num_projects=args.projects, issues_per_project=args.issues, num_entries=args.entries)
+    first_day = date(2026, 1, 1)
+    months = [(first_day.replace(month=month), first_day.replace(month=month + 1) - timedelta(days=1))
+              for month in (1, 2)] + [(date(2026, 3, 1), date(2026, 3, 31))]
+    with tempfile.TemporaryDirectory() as directory:
+        def spec(name, from_date, to_date, **kwargs):
+            return ReportSpec(os.path.join(directory, name + '.' + args.format), from_date, to_date,
+                              output_format=args.format, **kwargs)
+        specs = [spec('month{}'.format(i), *month) for i, month in enumerate(months)]
+        specs.append(spec('quarter', months[0][0], months[-1][1]))
+        specs.extend(spec('project{}'.format(project['id']), months[0][0], months[-1][1], projects=[project['id']])
+                     for project in data['projects'])
+        specs.append(spec('quarter_ru', months[0][0], months[-1][1], lang='RU', excluded_activities={'Management'}))
+
+        def run(batch_specs, workers):
+            rmman = RedmineManager()
+            rmman.connect(url=fake.url, api_key='benchmark')
+            Batch(batch_specs).fetch(rmman).generate_all(workers=workers)
+
+        timings = []
+        with FakeRedmine(data, latency=args.latency, separate_process=True) as fake, redirect_stdout(StringIO()):
+            for label, batches, workers in (('largest report only', [[specs[3]]], 1),
+                                            ('one by one', [[report_spec] for report_spec in specs], 1),
+                                            ('batch', [specs], args.workers)):
+                requests_before = fake.request_count
+                time_point = timeit.default_timer()
+                for batch_specs in batches:
+                    run(batch_specs, workers)
+                timings.append((label, timeit.default_timer() - time_point, fake.request_count - requests_before))
+    print('{} reports, {} workers'.format(len(specs), args.workers or os.cpu_count()))
+    for label, seconds, requests in timings:
+        print('{:>20}: {:.3f} seconds, {} Redmine requests'.format(label, seconds, requests))
+
+
+def bench_service(args):
+    """Latency of a ReportService under concurrent clients requesting a mix of time intervals and formats.
+
+    With --cache the service keeps resources in a SQLite cache shared by the concurrent requests.
+    Exits with status 1 if any request fails.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from urllib.error import HTTPError
+    from urllib.request import urlopen
+    from service import ReportService
+    data = generate_data(num_projects=args.projects, issues_per_project=args.issues, num_entries=args.entries)
+    rnd = random.Random(0)
+    intervals = [(date(2026, 1, 1) + timedelta(days=start), date(2026, 1, 1) + timedelta(days=start + length))
+                 for start, length in ((rnd.randrange(60), rnd.randrange(7, 30)) for _ in range(args.intervals))]
+    queries = ['from={}&to={}&format={}'.format(*rnd.choice(intervals), rnd.choice(args.formats))
+               for _ in range(args.requests)]
+
+    failures = []
+
+    def request(query):
+        time_point = timeit.default_timer()
+        try:
+            with urlopen('{}/report?{}'.format(base_url, query)) as response:
+                response.read()
+        except HTTPError as error:
+            failures.append('{} {}'.format(error.code, error.read().decode('utf-8', 'replace')))
+        return timeit.default_timer() - time_point
+
+    with FakeRedmine(data, latency=args.latency, separate_process=True) as fake, redirect_stdout(StringIO()), \
+            tempfile.TemporaryDirectory() as directory:
+        time_point = timeit.default_timer()
+        report_service = ReportService(url=fake.url, api_key='benchmark',
+                                       cache_path=os.path.join(directory, 'cache.sqlite') if args.cache else '').start()
+        startup_seconds = timeit.default_timer() - time_point
+        server = report_service.serve(port=0)
+        base_url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+        startup_requests = fake.request_count
+        time_point = timeit.default_timer()
+        with ThreadPoolExecutor(max_workers=args.clients) as clients:
+            latencies = sorted(clients.map(request, queries))
+        seconds = timeit.default_timer() - time_point
+        redmine_requests = fake.request_count - startup_requests
+        report_service.stop()
+    print('{} requests of {} distinct reports from {} clients in {:.2f} seconds, {} Redmine requests'.format(
+        len(queries), len(set(queries)), args.clients, seconds, redmine_requests))
+    print('{:>12}: {:.3f} seconds'.format('startup', startup_seconds))
+    for label, quantile in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0)):
+        print('{:>12}: {:.3f} seconds'.format(label, latencies[min(len(latencies) - 1, int(quantile * len(latencies)))]))
+    if failures:
+        print('{} requests failed, first: {}'.format(len(failures), failures[0]))
+        sys.exit(1)
+
+
+def bench_records(args):
+    """Time and memory of fetching time entries as python-redmine resources and as slim records."""
+    data = generate_data(num_projects=args.projects, issues_per_project=args.issues, num_entries=args.entries)
+
+    def touch(time_entries):  # Read the fields the report reads, as get_time_entries and walk do
+        return sum(entry.hours for entry in time_entries
+                   if entry.user.name and entry.activity.name and (not hasattr(entry, 'issue') or entry.issue.id))
+
+    with FakeRedmine(data, separate_process=True) as fake:
+        rmman = RedmineManager()
+        rmman.connect(url=fake.url, api_key='benchmark', cache_path='')
+        rmman.set_time_interval(from_date=date(2026, 1, 1), to_date=date(2026, 12, 31))
+        fetchers = (('resources', lambda: list(rmman.redmine.time_entry.filter(from_date=rmman.from_date,
+                                                                              to_date=rmman.to_date))),
+                    ('records', rmman.fetch_time_entries))
+        print('{} time entries'.format(len(data['time_entries'])))
+        print('{:>10} {:>10} {:>10} {:>16} {:>12}'.format('kind', 'seconds', 'hours', 'bytes per entry', 'peak MB'))
+        for label, fetch in fetchers:
+            gc.collect()
+            time_point = timeit.default_timer()
+            hours = touch(fetch())
+            seconds = timeit.default_timer() - time_point
+            tracemalloc.start()
+            time_entries = fetch()
+            touch(time_entries)
+            memory, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del time_entries
+            print('{:>10} {:>10.3f} {:>10.2f} {:>16.0f} {:>12.1f}'.format(label, seconds, hours,
+                                                                          memory / len(data['time_entries']), peak / 1e6))
+
+
+def bench_async(args):
+    """Wall-clock time and time to the first project table of the sync pipeline and of AsyncRedmineManager."""
+    import asyncio
+    from async_manager import generate_report
+    from exporters import CsvReport
+    data = generate_data(num_projects=args.projects, issues_per_project=args.issues, num_entries=args.entries)
+
+    class TimedReport(CsvReport):
+        """CsvReport noting when the first table arrives."""
+        first_table = None
+
+        def add_table(self, table):
+            if self.first_table is None:
+                self.first_table = timeit.default_timer()
+            super().add_table(table)
+
+    def run_sync(url, report, bulk):
+        rmman = RedmineManager()
+        rmman.connect(url=url, api_key='benchmark', cache_path='')
+        rmman.set_time_interval(from_date=date(2026, 1, 1), to_date=date(2026, 3, 31))
+        rmman.get_roles()
+        rmman.get_projects()
+        if bulk:
+            rmman.get_time_entries()
+        rmman.get_project_time()
+        main.write_report(report, rmman)
+        rmman.executor.shutdown()
+
+    runs = (('sync', partial(run_sync, bulk=False)),
+            ('sync bulk', partial(run_sync, bulk=True)),
+            ('async', lambda url, report: asyncio.run(generate_report(report, date(2026, 1, 1), date(2026, 3, 31),
+                                                                      url=url, api_key='benchmark'))))
+    timings = []
+    with FakeRedmine(data, latency=args.latency, separate_process=True) as fake, \
+            tempfile.TemporaryDirectory() as directory, redirect_stdout(StringIO()):
+        for label, run in runs:
+            report = TimedReport()
+            report.create(filename=os.path.join(directory, 'report.csv'))
+            requests_before = fake.request_count
+            time_point = timeit.default_timer()
+            run(fake.url, report)
+            timings.append((label, timeit.default_timer() - time_point, report.first_table - time_point,
+                            fake.request_count - requests_before))
+    print('{} projects, {:.0f} ms latency'.format(args.projects, args.latency * 1000))
+    print('{:>10} {:>10} {:>14} {:>10}'.format('mode', 'seconds', 'first table', 'requests'))
+    for timing in timings:
+        print('{:>10} {:>10.3f} {:>14.3f} {:>10}'.format(*timing))
+
+
+def git_revision() -> str:
+    """Short hash of the checked out revision, with '-dirty' if tracked files have been changed."""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        changes = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                                 text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return revision + '-dirty' if changes else revision
+
+
+def timings(runs) -> dict:
+    """Summary of the seconds of repeated runs. The median and the minimum are less affected by noise than the mean."""
+    return {'median': statistics.median(runs), 'min': min(runs), 'runs': runs}
+
+
+def repeat(func, times) -> dict:
+    """Call func, which returns the seconds of its measured part, several times."""
+    runs = []
+    for _ in range(times):
+        gc.collect()  # Garbage of the previous run is not collected during the next one
+        runs.append(func())
+    return timings(runs)
+
+
+def run_main(url, filename, from_date, to_date) -> dict:
+    """Run the main.py pipeline against url, return {phase: seconds} from the instrumentation spans."""
+    profiler = instrumentation.start()
+    time_point = timeit.default_timer()
+    try:
+        with redirect_stdout(StringIO()):  # Silence progress output
+            rmman = RedmineManager()
+            rmman.connect(url=url, api_key='benchmark', cache_path='')  # Every run fetches everything
+            rmman.set_time_interval(from_date=from_date, to_date=to_date)
+            rmman.get_roles()
+            rmman.get_projects()
+            main.get_project_time(rmman)
+            main.write_report(main.create_report(filename=filename, output_format='pdf'), rmman)
+            rmman.executor.shutdown()
+    finally:
+        instrumentation.stop()
+    phases = {'total': timeit.default_timer() - time_point}
+    for span in profiler.spans:
+        phases[span.name] = phases.get(span.name, 0) + span.duration  # Spans of every project add up
+    return phases
+
+
+def bench_pipeline(data, latency, times) -> dict:
+    """Seconds of every phase of the main.py pipeline against a FakeRedmine serving data."""
+    spent_on = [entry['spent_on'] for entry in data['time_entries']] or [str(date.today())]
+    from_date, to_date = date.fromisoformat(min(spent_on)), date.fromisoformat(max(spent_on))
+    runs = defaultdict(list)
+    with FakeRedmine(data, latency=latency, separate_process=True) as fake, tempfile.TemporaryDirectory() as directory:
+        for _ in range(times):
+            gc.collect()
+            requests_before = fake.request_count
+            for phase, seconds in run_main(fake.url, os.path.join(directory, 'report.pdf'), from_date, to_date).items():
+                runs[phase].append(seconds)
+            requests = fake.request_count - requests_before
+    results = {'pipeline.' + phase: timings(phase_runs) for phase, phase_runs in runs.items()}
+    results['pipeline.total']['requests'] = requests
+    return results
+
+
+def bench_walk(num_issues, num_entries, times) -> dict:
+    """Seconds of RedmineManager.walk filling an IssueTree from the time entry index."""
+    rnd = random.Random(0)
+    rmman = synthetic_manager(num_projects=1)
+    project = rmman.projects[0]
+    issues = synthetic_issues(num_issues)
+    users = list(project.user_roles)
+    rmman.issue_entries = defaultdict(list)
+    for _ in range(num_entries):
+        rmman.issue_entries[rnd.randrange(num_issues)].append(
+            SimpleNamespace(user=SimpleNamespace(name=rnd.choice(users)),
+                            activity=SimpleNamespace(name=rnd.choice(rmman.activities)),
+                            hours=rnd.choice([0.25, 0.5, 1.0, 2.0, 4.0, 8.0])))
+
+    def run():
+        tree = IssueTree().build(issues)
+        time_point = timeit.default_timer()
+        rmman.walk(tree=tree, project=project)
+        return timeit.default_timer() - time_point
+    return repeat(run, times)
+
+
+def bench_calculate_activity(num_entries, times) -> dict:
+    """Seconds of RedmineManager.calculate_activity for a synthetic stream of time entries."""
+    rmman = synthetic_manager()
+    projects = {project.project.id: project for project in rmman.projects}
+    calls = [(projects[project_id].user_roles[user], activity)
+             for project_id, user, activity, _, _ in synthetic_entries(rmman, num_entries)
+             if user in projects[project_id].user_roles]
+
+    def run():
+        time_point = timeit.default_timer()
+        for set_of_roles, activity in calls:
+            rmman.calculate_activity(set_of_roles, activity)
+        return timeit.default_timer() - time_point
+    return repeat(run, times)
+
+
+def bench_gen_report_table(num_tables, times) -> dict:
+    """Seconds of RedmineManager.gen_report_table for synthetic {user: {activity: hours}} dictionaries."""
+    rnd = random.Random(0)
+    rmman = synthetic_manager(num_projects=0)
+    dictionaries = [{'User {}'.format(u): {activity: rnd.choice([0.5, 1.5, 2.25, 8])
+                                           for activity in rnd.sample(rmman.activities, rnd.randint(1, 4))}
+                     for u in range(rnd.randint(1, 12))}
+                    for _ in range(num_tables)]
+
+    def run():
+        time_point = timeit.default_timer()
+        for i, dictionary in enumerate(dictionaries):
+            rmman.gen_report_table(label='#{}'.format(i), dictionary=dictionary)
+        return timeit.default_timer() - time_point
+    return repeat(run, times)
+
+
+def bench_suite(args):
+    """Run the full pipeline and the microbenchmarks, store the results by git revision."""
+    if args.fixture:
+        data = load_data(args.fixture)
+    else:
+        data = generate_data(num_projects=args.projects, num_users=args.users, issues_per_project=args.issues,
+                             num_entries=args.entries)
+    results = bench_pipeline(data, args.latency, args.repeat)
+    results['walk'] = bench_walk(args.walk_issues, args.walk_entries, args.repeat)
+    results['calculate_activity'] = bench_calculate_activity(args.resolve_entries, args.repeat)
+    results['gen_report_table'] = bench_gen_report_table(args.tables, args.repeat)
+    revision = args.revision or git_revision()
+    record = {'revision': revision,
+              'date': date.today().isoformat(),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'cpus': os.cpu_count(),
+              'settings': {name: getattr(main, name) for name in ('BULK_FETCH', 'FETCH_WORKERS', 'FETCH_PAGE_SIZE',
+                                                                  'AGGREGATION_BACKEND', 'STREAM_REPORT',
+                                                                  'RENDER_WORKERS', 'ISSUE_TREE_DEPTH')},
+              'parameters': {name: value for name, value in vars(args).items() if name not in ('func', 'output')},
+              'results': results}
+    os.makedirs(args.output, exist_ok=True)
+    filename = os.path.join(args.output, revision + '.json')
+    with open(filename, 'w', encoding='utf-8') as result_file:
+        json.dump(record, result_file, indent=1)
+    print('{:>44} {:>10} {:>10}'.format('benchmark', 'median', 'min'))
+    for name, result in results.items():
+        print('{:>44} {:>10.4f} {:>10.4f}'.format(name, result['median'], result['min']))
+    print('Results stored in ' + filename)
+
+
+def load_results(revision, directory) -> dict:
+    """Results stored by bench_suite, revision is a git revision or the path of a result file."""
+    filename = revision if os.path.isfile(revision) else os.path.join(directory, revision + '.json')
+    with open(filename, encoding='utf-8') as result_file:
+        return json.load(result_file)
+
+
+def bench_compare(args):
+    """Compare the medians of two stored suite results, marking changes larger than the threshold."""
+    base, new = load_results(args.base, args.output), load_results(args.new, args.output)
+    for key in ('settings', 'parameters', 'cpus', 'python'):
+        if base.get(key) != new.get(key):
+            print('Warning: {} differ, results may not be comparable'.format(key))
+    print('{:>44} {:>10} {:>10} {:>8}'.format('benchmark', base['revision'][:10], new['revision'][:10], 'change'))
+    for name, result in new['results'].items():
+        if name not in base['results']:
+            continue
+        before, after = base['results'][name]['median'], result['median']
+        change = after / before - 1 if before else 0
+        # A change counts if it exceeds the threshold and the runs do not overlap
+        if change > args.threshold and result['min'] > max(base['results'][name]['runs']):
+            mark = 'slower'
+        elif change < -args.threshold and max(result['runs']) < base['results'][name]['min']:
+            mark = 'faster'
+        else:
+            mark = ''
+        print('{:>44} {:>10.4f} {:>10.4f} {:>+7.1%} {}'.format(name, before, after, change, mark))
+
+
+def bench_record(args):
+    """Record a fixture from the live Redmine of settings to serve with FakeRedmine."""
+    verify = False if main.SUPPRESS_WARNINGS else main.CERT_PATH
+    data = record_data(main.REDMINE_URL, main.REDMINE_KEY, args.from_date, args.to_date, verify=verify)
+    save_data(data, args.fixture)
+    print('{} projects, {} issues, {} time entries recorded to {}'.format(
+        len(data['projects']), len(data['issues']), len(data['time_entries']), args.fixture))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    workers_parser = subparsers.add_parser('workers', help=bench_workers.__doc__)
+    workers_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    workers_parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response')
+    workers_parser.add_argument('--projects', type=int, default=10)
+    workers_parser.add_argument('--issues', type=int, default=50, help='issues per project')
+    workers_parser.add_argument('--entries', type=int, default=5000)
+    workers_parser.add_argument('--bulk', action='store_true', help='fetch all time entries in one sweep')
+    workers_parser.set_defaults(func=bench_workers)
+
+    tree_parser = subparsers.add_parser('tree', help=bench_tree.__doc__)
+    tree_parser.add_argument('--nodes', type=int, default=100000)
+    tree_parser.set_defaults(func=bench_tree)
+
+    aggregation_parser = subparsers.add_parser('aggregation', help=bench_aggregation.__doc__)
+    aggregation_parser.add_argument('--entries', type=int, default=1000000)
+    aggregation_parser.set_defaults(func=bench_aggregation)
+
+    resolver_parser = subparsers.add_parser('resolver', help=bench_resolver.__doc__)
+    resolver_parser.add_argument('--entries', type=int, default=2000000)
+    resolver_parser.set_defaults(func=bench_resolver)
+
+    report_parser = subparsers.add_parser('report', help=bench_report.__doc__)
+    report_parser.add_argument('--tables', type=int, nargs='+', default=[1000, 10000])
+    report_parser.set_defaults(func=bench_report)
+
+    render_parser = subparsers.add_parser('render', help=bench_render.__doc__)
+    render_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    render_parser.add_argument('--tables', type=int, default=5000)
+    render_parser.add_argument('--tables-per-project', type=int, default=100)
+    render_parser.set_defaults(func=bench_render)
+
+    export_parser = subparsers.add_parser('export', help=bench_export.__doc__)
+    export_parser.add_argument('--tables', type=int, default=5000)
+    export_parser.set_defaults(func=bench_export)
+
+    buckets_parser = subparsers.add_parser('buckets', help=bench_buckets.__doc__)
+    buckets_parser.add_argument('--entries', type=int, default=200000)
+    buckets_parser.add_argument('--days', type=int, default=730)
+    buckets_parser.add_argument('--projects', type=int, default=20)
+    buckets_parser.add_argument('--issues', type=int, default=50, help='issues per project')
+    buckets_parser.add_argument('--intervals', type=int, default=50)
+    buckets_parser.add_argument('--changes', type=int, default=100, help='time entries changed before the update')
+    buckets_parser.set_defaults(func=bench_buckets)
+
+    batch_parser = subparsers.add_parser('batch', help=bench_batch.__doc__)
+    batch_parser.add_argument('--workers', type=int, default=None, help='processes generating reports')
+    batch_parser.add_argument('--format', default='csv')
+    batch_parser.add_argument('--latency', type=float, default=0.02, help='seconds added to every response')
+    batch_parser.add_argument('--projects', type=int, default=10)
+    batch_parser.add_argument('--issues', type=int, default=50, help='issues per project')
+    batch_parser.add_argument('--entries', type=int, default=5000)
+    batch_parser.set_defaults(func=bench_batch)
+
+    service_parser = subparsers.add_parser('service', help=bench_service.__doc__)
+    service_parser.add_argument('--requests', type=int, default=500)
+    service_parser.add_argument('--clients', type=int, default=16, help='concurrent client threads')
+    service_parser.add_argument('--intervals', type=int, default=20, help='distinct time intervals requested')
+    service_parser.add_argument('--formats', nargs='+', default=['csv', 'ndjson'])
+    service_parser.add_argument('--latency', type=float, default=0.01, help='seconds added to every response')
+    service_parser.add_argument('--projects', type=int, default=10)
+    service_parser.add_argument('--issues', type=int, default=50, help='issues per project')
+    service_parser.add_argument('--entries', type=int, default=5000)
+    service_parser.add_argument('--cache', action='store_true', help='keep resources in a SQLite cache')
+    service_parser.set_defaults(func=bench_service)
+
+    records_parser = subparsers.add_parser('records', help=bench_records.__doc__)
+    records_parser.add_argument('--projects', type=int, default=20)
+    records_parser.add_argument('--issues', type=int, default=100, help='issues per project')
+    records_parser.add_argument('--entries', type=int, default=50000)
+    records_parser.set_defaults(func=bench_records)
+
+    async_parser = subparsers.add_parser('async', help=bench_async.__doc__)
+    async_parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response')
+    async_parser.add_argument('--projects', type=int, default=20)
+    async_parser.add_argument('--issues', type=int, default=50, help='issues per project')
+    async_parser.add_argument('--entries', type=int, default=20000)
+    async_parser.set_defaults(func=bench_async)
+
+    suite_parser = subparsers.add_parser('suite', help=bench_suite.__doc__)
+    suite_parser.add_argument('--fixture', help='JSON fixture recorded with the record benchmark, synthetic if omitted')
+    suite_parser.add_argument('--repeat', type=int, default=5, help='runs of every benchmark')
+    suite_parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    suite_parser.add_argument('--projects', type=int, default=10)
+    suite_parser.add_argument('--users', type=int, default=20)
+    suite_parser.add_argument('--issues', type=int, default=50, help='issues per project')
+    suite_parser.add_argument('--entries', type=int, default=5000)
+    suite_parser.add_argument('--walk-issues', type=int, default=20000)
+    suite_parser.add_argument('--walk-entries', type=int, default=200000)
+    suite_parser.add_argument('--resolve-entries', type=int, default=200000)
+    suite_parser.add_argument('--tables', type=int, default=20000, help='tables generated by gen_report_table')
+    suite_parser.add_argument('--revision', help='name of the results, the git revision by default')
+    suite_parser.add_argument('--output', default='benchmark_results', help='directory of the results')
+    suite_parser.set_defaults(func=bench_suite)
+
+    compare_parser = subparsers.add_parser('compare', help=bench_compare.__doc__)
+    compare_parser.add_argument('base', help='revision or result file')
+    compare_parser.add_argument('new', help='revision or result file')
+    compare_parser.add_argument('--threshold', type=float, default=0.05, help='relative change counted')
+    compare_parser.add_argument('--output', default='benchmark_results', help='directory of the results')
+    compare_parser.set_defaults(func=bench_compare)
+
+    record_parser = subparsers.add_parser('record', help=bench_record.__doc__)
+    record_parser.add_argument('fixture', help='JSON file written')
+    record_parser.add_argument('--from', dest='from_date', type=date.fromisoformat, required=True)
+    record_parser.add_argument('--to', dest='to_date', type=date.fromisoformat, default=date.today())
+    record_parser.set_defaults(func=bench_record)
+
+    arguments = parser.parse_args()
+    arguments.func(arguments)
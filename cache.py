@@ -0,0 +1,286 @@
+"""Module containing RedmineCache, a local SQLite store of Redmine resources synchronized incrementally."""
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from fetch import bounded_map, fetch_count, fetch_pages
+try:
+    from local_settings import *
+except ImportError:
+    from settings import *
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS reference (name TEXT PRIMARY KEY, synced TEXT, data TEXT);
+CREATE TABLE IF NOT EXISTS issues (id INTEGER PRIMARY KEY, project_id INTEGER, parent_id INTEGER, data TEXT);
+CREATE INDEX IF NOT EXISTS issues_project ON issues (project_id);
+CREATE TABLE IF NOT EXISTS time_entries (id INTEGER PRIMARY KEY, spent_on TEXT, data TEXT);
+CREATE INDEX IF NOT EXISTS time_entries_spent_on ON time_entries (spent_on);
+-- Days whose time entries changed since hour_buckets were last updated, see aggregates.py
+CREATE TABLE IF NOT EXISTS dirty_days (day TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS hour_buckets (level TEXT, start TEXT, project_id INTEGER, issue_id INTEGER, user TEXT,
+                                         activity TEXT, hours REAL, last_entry TEXT,
+                                         PRIMARY KEY (level, start, project_id, issue_id, user, activity));
+"""
+
+# Issues and time entries changed shortly before a sync started may be missing from its responses,
+# so the next sync starts a bit earlier. Records fetched twice are simply overwritten.
+SYNC_OVERLAP = timedelta(minutes=5)
+
+
+def month_windows(from_date, to_date) -> list:
+    """Split [from_date, to_date] into (first day, last day) windows not crossing month boundaries."""
+    windows = []
+    start = from_date
+    while start <= to_date:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        end = min(to_date, next_month - timedelta(days=1))
+        windows.append((start, end))
+        start = next_month
+    return windows
+
+
+class RedmineCache:
+    """Class RedmineCache for keeping Redmine resources between runs.
+
+       Resources are stored as the JSON received from Redmine. Issues and time entries are synchronized
+       incrementally by their updated_on attribute, the rest is refetched when older than CACHE_REFERENCE_TTL hours.
+       Several caches (e.g. of concurrent service requests) may use one database: every sync fetches everything
+       first and then writes it in one short transaction, so the database is never locked during a request.
+
+       redmine - connected Redmine object used for fetching
+       executor - runs requests for several projects or months in parallel. Never the page executor of the engine:
+                  every request may fetch its pages through that one and would wait for workers busy waiting for it
+       full_refresh - ignore everything stored and fetch the resources again
+    """
+
+    def __init__(self, redmine, path=CACHE_PATH, executor=None, full_refresh=CACHE_FULL_REFRESH):
+        self.redmine = redmine
+        self.executor = executor
+        self.path = path
+        self.full_refresh = full_refresh
+        self.db = sqlite3.connect(path, timeout=CACHE_LOCK_TIMEOUT, check_same_thread=False)  # Workers only read
+        self.db.execute('PRAGMA journal_mode=WAL')  # Readers do not wait for the writer
+        self.db.executescript(SCHEMA)
+        with self.transaction():
+            if self.get_meta('url') != redmine.url:  # Never mix resources of different Redmine instances
+                self.clear()
+                self.set_meta('url', redmine.url)
+
+    @contextmanager
+    def transaction(self):
+        """Write in one transaction, committed at the end of the block or rolled back on errors.
+
+        The write lock is taken at the start, so the reads of the block see no changes of other connections.
+        """
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.db.rollback()
+            raise
+        self.db.commit()
+
+    def clear(self):
+        """Remove all stored resources."""
+        for table in ('meta', 'reference', 'issues', 'time_entries', 'dirty_days', 'hour_buckets'):
+            self.db.execute('DELETE FROM ' + table)
+
+    def get_meta(self, key):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        self.db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def fetch(self, path, container, **params) -> list:
+        """Fetch all pages of a Redmine resource list as raw JSON dictionaries, paging by the limit Redmine returns."""
+        return fetch_pages(self.redmine.engine, self.redmine.url + path, container, **params)
+
+    def parallel_map(self, func, iterable):
+        """Apply func to every item with the executor, or one after another without one, keeping the order."""
+        if self.executor is None:
+            return map(func, iterable)
+        return bounded_map(self.executor, func, iterable, self.redmine.engine.workers)
+
+    def count(self, path, **params) -> int:
+        """Get total_count of a Redmine resource list with a single one-item request."""
+        return fetch_count(self.redmine.engine, self.redmine.url + path, **params)
+
+    def reference(self, name, fetch, force=False):
+        """Get reference data (roles, activities, projects, ...) stored under name.
+
+        fetch - function returning the data from Redmine, called if the stored data is missing or outdated
+        force - call fetch regardless of the stored data
+        """
+        row = self.db.execute('SELECT synced, data FROM reference WHERE name = ?', (name,)).fetchone()
+        if row and not (self.full_refresh or force):
+            synced = datetime.fromisoformat(row[0])
+            if datetime.now(timezone.utc) - synced < timedelta(hours=CACHE_REFERENCE_TTL):
+                return json.loads(row[1])
+        data = fetch()
+        with self.transaction():
+            self.db.execute('INSERT OR REPLACE INTO reference (name, synced, data) VALUES (?, ?, ?)',
+                            (name, datetime.now(timezone.utc).isoformat(), json.dumps(data)))
+        return data
+
+    def activities(self, force=False) -> list:
+        return self.reference('activities', lambda: self.fetch('/enumerations/time_entry_activities.json',
+                                                               'time_entry_activities'), force)
+
+    def roles(self, force=False) -> list:
+        return self.reference('roles', lambda: self.fetch('/roles.json', 'roles'), force)
+
+    def projects(self, force=False) -> list:
+        return self.reference('projects', lambda: self.fetch('/projects.json', 'projects'), force)
+
+    def memberships(self, project_ids, force=False) -> dict:
+        """Get {project id: [memberships]} for the projects, fetching memberships of all projects in parallel."""
+        keys = [str(project_id) for project_id in project_ids]  # JSON object keys are strings
+
+        def fetch():
+            memberships = self.parallel_map(lambda key: self.fetch('/projects/{}/memberships.json'.format(key),
+                                                                   'memberships'),
+                                            keys)
+            return dict(zip(keys, memberships))
+
+        data = self.reference('memberships', fetch, force)
+        if any(key not in data for key in keys):  # New projects appeared
+            data = self.reference('memberships', fetch, force=True)
+        return {int(key): data[key] for key in keys}
+
+    @staticmethod
+    def updated_since(timestamp) -> str:
+        return '>=' + (datetime.fromisoformat(timestamp) - SYNC_OVERLAP).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def store_issues(self, issues):
+        self.db.executemany('INSERT OR REPLACE INTO issues (id, project_id, parent_id, data) VALUES (?, ?, ?, ?)',
+                            ((issue['id'], issue['project']['id'], issue.get('parent', {}).get('id'), json.dumps(issue))
+                             for issue in issues))
+
+    def stored_days(self, ids) -> dict:
+        """Get {id: spent_on} of the stored time entries among ids."""
+        ids = list(ids)
+        days = {}
+        for start in range(0, len(ids), 500):  # Stay below the SQLite limit of query parameters
+            chunk = ids[start:start + 500]
+            days.update(self.db.execute('SELECT id, spent_on FROM time_entries WHERE id IN ({})'
+                                        .format(','.join('?' * len(chunk))), chunk))
+        return days
+
+    def store_time_entries(self, time_entries):
+        """Store time entries, marking the days they were spent on (before and after an update) as changed."""
+        time_entries = list(time_entries)
+        days = {entry['spent_on'] for entry in time_entries}
+        days.update(self.stored_days(entry['id'] for entry in time_entries).values())
+        self.db.executemany('INSERT OR IGNORE INTO dirty_days (day) VALUES (?)', ((day,) for day in days))
+        self.db.executemany('INSERT OR REPLACE INTO time_entries (id, spent_on, data) VALUES (?, ?, ?)',
+                            ((entry['id'], entry['spent_on'], json.dumps(entry)) for entry in time_entries))
+
+    def delete_time_entries(self, where='', params=()):
+        """Delete stored time entries matching the WHERE clause, marking their days as changed."""
+        self.db.execute('INSERT OR IGNORE INTO dirty_days (day) SELECT DISTINCT spent_on FROM time_entries ' + where,
+                        params)
+        self.db.execute('DELETE FROM time_entries ' + where, params)
+
+    def fetch_time_entries(self, from_date, to_date, **params) -> list:
+        return self.fetch('/time_entries.json', 'time_entries', **dict(params, **{'from': from_date, 'to': to_date}))
+
+    def sync_issues(self):
+        """Bring stored issues of all projects up to date."""
+        started = datetime.now(timezone.utc).isoformat()
+        synced = self.get_meta('issues_synced')
+        replace = synced is None or self.full_refresh
+        if replace:
+            issues = self.fetch('/issues.json', 'issues', status_id='*')
+        else:
+            issues = self.fetch('/issues.json', 'issues', status_id='*', updated_on=self.updated_since(synced))
+            # Once updates are merged, fewer issues in Redmine than stored means some have been deleted
+            ids = [issue['id'] for issue in issues]
+            stored = self.db.execute('SELECT COUNT(*) FROM issues').fetchone()[0] + len(ids) - self.count_stored(ids)
+            if self.count('/issues.json', status_id='*') != stored:
+                issues, replace = self.fetch('/issues.json', 'issues', status_id='*'), True
+        with self.transaction():
+            if replace:
+                self.db.execute('DELETE FROM issues')
+            self.store_issues(issues)
+            self.set_meta('issues_synced', started)
+
+    def count_stored(self, issue_ids) -> int:
+        """Get how many of the issues are stored."""
+        count = 0
+        for start in range(0, len(issue_ids), 500):  # Stay below the SQLite limit of query parameters
+            chunk = issue_ids[start:start + 500]
+            count += self.db.execute('SELECT COUNT(*) FROM issues WHERE id IN ({})'.format(','.join('?' * len(chunk))),
+                                     chunk).fetchone()[0]
+        return count
+
+    def sync_time_entries(self, from_date, to_date):
+        """Bring stored time entries up to date and make sure they cover [from_date, to_date]."""
+        started = datetime.now(timezone.utc).isoformat()
+        synced = self.get_meta('time_entries_synced')
+        refetched = []  # (first day, last day, time entries) of windows replaced as a whole
+        if synced is None or self.full_refresh:
+            time_entries = []
+            refetched.append((None, None, self.fetch_time_entries(from_date, to_date)))
+            covered_from, covered_to = from_date, to_date
+        else:
+            covered_from = date.fromisoformat(self.get_meta('time_entries_from'))
+            covered_to = date.fromisoformat(self.get_meta('time_entries_to'))
+            # Changes within the range covered so far
+            time_entries = self.fetch_time_entries(covered_from, covered_to, updated_on=self.updated_since(synced))
+            # Parts of the requested range not covered yet are fetched in full
+            if from_date < covered_from:
+                time_entries.extend(self.fetch_time_entries(from_date, covered_from - timedelta(days=1)))
+                covered_from = from_date
+            if to_date > covered_to:
+                time_entries.extend(self.fetch_time_entries(covered_to + timedelta(days=1), to_date))
+                covered_to = to_date
+            refetched = self.fetch_deleted_time_entries(from_date, to_date, time_entries)
+        with self.transaction():
+            self.store_time_entries(time_entries)
+            for start, end, window_entries in refetched:
+                if start is None:
+                    self.delete_time_entries()
+                else:
+                    self.delete_time_entries('WHERE spent_on BETWEEN ? AND ?', (str(start), str(end)))
+                self.store_time_entries(window_entries)
+            self.set_meta('time_entries_from', str(covered_from))
+            self.set_meta('time_entries_to', str(covered_to))
+            self.set_meta('time_entries_synced', started)
+
+    def fetch_deleted_time_entries(self, from_date, to_date, time_entries) -> list:
+        """Find months of [from_date, to_date] where time entries have been deleted in Redmine and refetch them.
+
+        time_entries - created and updated time entries about to be stored. A month that would hold more stored
+                       entries than Redmine reports for it once they are merged has lost some.
+        Each month costs one single-item request. Returns [(first day, last day, time entries of the month)].
+        """
+        windows = month_windows(from_date, to_date)
+        counts = self.parallel_map(lambda window: self.count('/time_entries.json',
+                                                             **{'from': window[0], 'to': window[1]}),
+                                   windows)
+        old_days = list(self.stored_days(entry['id'] for entry in time_entries).values())
+        new_days = [entry['spent_on'] for entry in time_entries]
+        deleted = []
+        for (start, end), count in zip(windows, counts):
+            first, last = str(start), str(end)
+            stored = self.db.execute('SELECT COUNT(*) FROM time_entries WHERE spent_on BETWEEN ? AND ?',
+                                     (first, last)).fetchone()[0]
+            stored += (sum(first <= day <= last for day in new_days)  # Updated entries may move between months
+                       - sum(first <= day <= last for day in old_days))
+            if stored != count:
+                deleted.append((start, end))
+        return [(start, end, self.fetch_time_entries(start, end)) for start, end in deleted]
+
+    def time_entries(self, from_date, to_date) -> list:
+        """Get stored time entries spent in [from_date, to_date], most recent first like Redmine returns them."""
+        rows = self.db.execute('SELECT data FROM time_entries WHERE spent_on BETWEEN ? AND ? '
+                               'ORDER BY spent_on DESC, id DESC', (str(from_date), str(to_date)))
+        return [json.loads(row[0]) for row in rows]
+
+    def issues(self, project_id) -> list:
+        """Get stored issues of the project (not of its subprojects), newest first like Redmine returns them."""
+        rows = self.db.execute('SELECT data FROM issues WHERE project_id = ? ORDER BY id DESC', (project_id,))
+        return [json.loads(row[0]) for row in rows]
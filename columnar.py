@@ -0,0 +1,139 @@
+"""Module containing TimeEntryColumns, a columnar store of time entries aggregated with NumPy.
+
+Used when AGGREGATION_BACKEND = 'numpy'. NumPy is only required by this module.
+Time entries are decoded from the JSON pages of Redmine straight into the columns, no records are created.
+"""
+
+import threading
+from array import array
+from datetime import date
+import numpy as np
+
+
+class TimeEntryColumns:
+    """Class TimeEntryColumns for holding time entries as typed arrays, one array per attribute.
+
+       user, activity - codes of user and activity names, see users and activities
+       project, issue - Redmine ids, issue is 0 for time entries not bound to an issue
+       spent_on - date as a proleptic Gregorian ordinal
+       hours - hours spent
+       users, activities - lists of names, indexed by code
+    """
+    columns = (('user', 'i', np.int32), ('activity', 'i', np.int32), ('project', 'i', np.int32),
+               ('issue', 'i', np.int32), ('spent_on', 'i', np.int32), ('hours', 'd', np.float64))
+
+    def __init__(self):
+        self.users = []
+        self.activities = []
+        self._user_codes = {}
+        self._activity_codes = {}
+        self._lock = threading.Lock()  # Pages are decoded in parallel threads
+        for name, _, dtype in self.columns:
+            setattr(self, name, np.empty(0, dtype=dtype))
+
+    def __len__(self):
+        return len(self.hours)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name, _, _ in self.columns)
+
+    def code(self, codes, names, name) -> int:
+        code = codes.get(name)
+        if code is None:
+            with self._lock:
+                code = codes.get(name)
+                if code is None:
+                    names.append(name)
+                    code = codes[name] = len(names) - 1
+        return code
+
+    def user_code(self, user) -> int:
+        return self.code(self._user_codes, self.users, user)
+
+    def activity_code(self, activity) -> int:
+        return self.code(self._activity_codes, self.activities, activity)
+
+    def decode_page(self, items) -> list:
+        """Decode a page of Redmine JSON time entries into typed arrays, a decode function for fetch_json.
+
+        Returns a one-item list holding the arrays of the page, one per column, to be added by extend().
+        """
+        page = tuple(array(typecode) for _, typecode, _ in self.columns)
+        users, activities, projects, issues, days, hours = page
+        user_code, activity_code, fromisoformat = self.user_code, self.activity_code, date.fromisoformat
+        for item in items:
+            users.append(user_code(item['user']['name']))
+            activities.append(activity_code(item['activity']['name']))
+            projects.append(item['project']['id'])
+            issues.append(item['issue']['id'] if 'issue' in item else 0)
+            days.append(fromisoformat(item['spent_on']).toordinal())
+            hours.append(item['hours'])
+        return [page]
+
+    def extend(self, pages):
+        """Add decoded pages to the arrays in order, one column at a time.
+
+        Every page column is emptied once copied, so a column is held twice at most while the pages are added.
+        """
+        for index, (name, typecode, dtype) in enumerate(self.columns):
+            merged = array(typecode)
+            for page in pages:
+                merged.extend(page[index])
+                del page[index][:]
+            added = np.frombuffer(merged, dtype=dtype) if merged else np.empty(0, dtype=dtype)  # No copy
+            existing = getattr(self, name)
+            setattr(self, name, np.concatenate([existing, added]) if len(existing) else added)
+        return self
+
+    @staticmethod
+    def map_values(values, mapping, default=-1):
+        """Map every value of an integer array through a dictionary, looking up each distinct value only once."""
+        distinct, inverse = np.unique(values, return_inverse=True)
+        lookup = np.array([mapping.get(value, default) for value in distinct.tolist()], dtype=np.int64)
+        return lookup[inverse.reshape(-1)]
+
+    def resolve_activities(self, resolve):
+        """Get activity codes after calling resolve(project_id, user, activity) -> activity name.
+
+        resolve is called once for every distinct (project, user, activity) combination, not for every entry.
+        """
+        num_users, num_activities = len(self.users) or 1, len(self.activities) or 1
+        keys = (self.project.astype(np.int64) * num_users + self.user) * num_activities + self.activity
+        distinct, inverse = np.unique(keys, return_inverse=True)
+        lookup = np.empty(len(distinct), dtype=np.int32)
+        for i, key in enumerate(distinct.tolist()):
+            project_key, activity = divmod(key, num_activities)
+            project_id, user = divmod(project_key, num_users)
+            lookup[i] = self.activity_code(resolve(project_id, self.users[user], self.activities[activity]))
+        return lookup[inverse.reshape(-1)]
+
+    def group_sum(self, table_codes, activity_codes=None, entry_order=None) -> dict:
+        """Sum hours grouped by table, user and activity in one vectorized pass.
+
+        table_codes - array with a non-negative table code for every time entry, entries with a negative code are skipped
+        activity_codes - activity codes to use instead of the activity column
+        entry_order - array of sort keys, time entries are taken in the order of their keys and then of their index
+        Returns {table code: {user: {activity: hours}}}. Users of a table are ordered by their first time entry,
+        the same order the dictionaries get when time entries are added one by one in that order.
+        """
+        activity = self.activity if activity_codes is None else activity_codes
+        selected = np.flatnonzero(table_codes >= 0)
+        if entry_order is not None:
+            selected = selected[np.argsort(entry_order[selected], kind='stable')]
+        num_users, num_activities = len(self.users) or 1, len(self.activities) or 1
+        keys = (table_codes[selected] * num_users + self.user[selected]) * num_activities + activity[selected]
+        distinct, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        sums = np.bincount(inverse.reshape(-1), weights=self.hours[selected], minlength=len(distinct))
+        tables = {}
+        for i in np.argsort(first, kind='stable').tolist():  # Groups in order of their first time entry
+            table_key, activity_code = divmod(int(distinct[i]), num_activities)
+            table_code, user_code = divmod(table_key, num_users)
+            table = tables.get(table_code)
+            if table is None:
+                table = tables[table_code] = {}
+            user_store = table.get(self.users[user_code])
+            if user_store is None:
+                user_store = table[self.users[user_code]] = {}
+            user_store[self.activities[activity_code]] = float(sums[i])
+        return tables
@@ -5,16 +5,19 @@ try:
 except ImportError:
     from settings import *
 from functools import wraps
+import instrumentation
 
 
 def timetrack(label):
-    """Utility function decorator for tracking execution time."""
+    """Utility function decorator for tracking execution time. The call is also recorded as an instrumentation span."""
     def timetrack_decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             time_point = timeit.default_timer()
-            func(*args, **kwargs)
+            with instrumentation.span(func.__qualname__):
+                result = func(*args, **kwargs)
             print(label + ': {sec:.3} seconds.'.format(sec=timeit.default_timer() - time_point))
+            return result
         return wrapper
     return timetrack_decorator
 
@@ -26,7 +29,7 @@ def suppress_warnings(func):
         if SUPPRESS_WARNINGS:
             with warnings.catch_warnings():  # NB: warnings disabled
                 warnings.filterwarnings("ignore")
-                func(*args, **kwargs)
+                return func(*args, **kwargs)
         else:
-            func(*args, **kwargs)
+            return func(*args, **kwargs)
     return wrapper
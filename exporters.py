@@ -0,0 +1,119 @@
+"""Module containing machine-readable report writers with the interface of Report: CSV, NDJSON and XLSX.
+
+They consume the same tables (see RedmineManager.gen_report_table) and never import reportlab.
+Every nonzero cell of a table becomes one record: section, table label, issue subject, user, activity, hours.
+XLSX output requires openpyxl.
+"""
+
+import csv
+import json
+from abc import ABC, abstractmethod
+
+FIELDS = ('section', 'table', 'subject', 'user', 'activity', 'hours')
+
+
+class TableExporter(ABC):
+    """Base class of writers turning report tables into records as soon as they are added.
+
+       section - title of the current section, empty for the project tables before the first one
+       subject - last header added, the subject of the issue whose table follows
+    """
+    extension = None
+    streaming = True  # Tables are written out as they are added
+
+    def __init__(self):
+        self.file = None
+        self.section = ''
+        self.subject = ''
+
+    def create(self, filename='redmine_report'):
+        """Create report."""
+        self.file = open(filename, 'w', newline='', encoding='utf-8')
+
+    def start_section(self, title):
+        """Start a new section, its title goes into the section field of the records."""
+        self.section = title
+        self.subject = ''
+
+    def add_header(self, header):
+        """Remember the subject of the issue, used by the next table."""
+        self.subject = header
+
+    def add_table(self, table):
+        """Write a record for every nonzero cell, the header row names activities and the total row is skipped."""
+        label, *activities = table[0]
+        for user, *hours in table[1:-1]:
+            for activity, value in zip(activities, hours):
+                if value:
+                    self.write((self.section, label, self.subject, user, activity, value))
+        self.subject = ''
+
+    def add_text(self, text, header=None, space_after=None):
+        """Text is not exported."""
+        pass
+
+    def add_space(self, num_inches=0.2):
+        """Spacing is not exported."""
+        pass
+
+    @abstractmethod
+    def write(self, record):
+        """Write a record of FIELDS."""
+
+    def build(self):
+        """Finish writing the report."""
+        self.file.close()
+
+
+class CsvReport(TableExporter):
+    """CSV with a header row of field names."""
+    extension = 'csv'
+
+    def __init__(self):
+        super().__init__()
+        self.writer = None
+
+    def create(self, filename='redmine_report.csv'):
+        super().create(filename)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(FIELDS)
+
+    def write(self, record):
+        self.writer.writerow(record)
+
+
+class JsonReport(TableExporter):
+    """Newline-delimited JSON, one object per record."""
+    extension = 'ndjson'
+
+    def write(self, record):
+        self.file.write(json.dumps(dict(zip(FIELDS, record)), ensure_ascii=False))
+        self.file.write('\n')
+
+
+class XlsxReport(TableExporter):
+    """Excel workbook with a single sheet of records, written row by row in openpyxl write-only mode."""
+    extension = 'xlsx'
+
+    def __init__(self):
+        super().__init__()
+        self.filename = None
+        self.workbook = None
+        self.sheet = None
+
+    def create(self, filename='redmine_report.xlsx'):
+        from openpyxl import Workbook  # Requires openpyxl
+        self.filename = filename
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet('Time')
+        self.sheet.append(FIELDS)
+
+    def write(self, record):
+        self.sheet.append(record)
+
+    def build(self):
+        """Write the report to disk."""
+        self.workbook.save(self.filename)
+
+
+EXPORTERS = {exporter.extension: exporter for exporter in (CsvReport, JsonReport, XlsxReport)}
@@ -0,0 +1,284 @@
+"""Module containing FakeRedmine, a local stub of the Redmine REST API used for benchmarking.
+
+Serves synthetic or recorded roles, activities, projects with memberships, issue hierarchies and time entries
+through the same JSON endpoints the report uses, with optional per-request latency.
+Fixtures are recorded from a live Redmine with record_data() and kept as JSON files (save_data, load_data).
+"""
+
+import json
+import multiprocessing
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl
+import requests
+
+
+def generate_data(num_projects=10, num_users=20, issues_per_project=50, max_depth=3,
+                  num_entries=5000, from_date=date(2026, 1, 1), num_days=90, seed=0) -> dict:
+    """Generate a synthetic Redmine instance as a dictionary of JSON-ready resource lists."""
+    rnd = random.Random(seed)
+    activities = [{'id': i + 1, 'name': name} for i, name in
+                  enumerate(['Design', 'Development', 'Testing', 'Management', 'Support'])]
+    roles = [{'id': i + 1, 'name': name} for i, name in enumerate(['Manager', 'Developer', 'Reporter'])]
+    users = [{'id': i + 1, 'name': 'User {}'.format(i + 1)} for i in range(num_users)]
+    projects, memberships, issues, time_entries = [], {}, [], []
+    for p in range(num_projects):
+        project = {'id': p + 1, 'name': 'Project {}'.format(p + 1), 'identifier': 'project-{}'.format(p + 1)}
+        if p and rnd.random() < 0.3:  # Some projects are subprojects
+            parent = rnd.choice(projects)
+            project['parent'] = {'id': parent['id'], 'name': parent['name']}
+        projects.append(project)
+        memberships[project['id']] = [{'id': p * num_users + u['id'],
+                                       'project': {'id': project['id'], 'name': project['name']},
+                                       'user': dict(u),
+                                       'roles': [dict(role) for role in rnd.sample(roles, rnd.randint(1, 2))]}
+                                      for u in rnd.sample(users, max(1, num_users // 2))]
+        levels = {}
+        for i in range(issues_per_project):
+            issue = {'id': len(issues) + 1,
+                     'project': {'id': project['id'], 'name': project['name']},
+                     'subject': 'Issue {} of {}'.format(i + 1, project['name']),
+                     'updated_on': '{}T00:00:00Z'.format(from_date)}
+            candidates = [candidate for candidate in issues[len(issues) - i:]
+                          if levels[candidate['id']] < max_depth]
+            if candidates and rnd.random() < 0.6:
+                parent = rnd.choice(candidates)
+                issue['parent'] = {'id': parent['id']}
+                levels[issue['id']] = levels[parent['id']] + 1
+            else:
+                levels[issue['id']] = 0
+            issues.append(issue)
+    issues_by_project = {}
+    for issue in issues:
+        issues_by_project.setdefault(issue['project']['id'], []).append(issue)
+    for i in range(num_entries):
+        project = rnd.choice(projects)
+        spent_on = from_date + timedelta(days=rnd.randrange(num_days))
+        entry = {'id': i + 1,
+                 'project': {'id': project['id'], 'name': project['name']},
+                 'user': dict(rnd.choice(users)),
+                 'activity': dict(rnd.choice(activities)),
+                 'hours': rnd.choice([0.25, 0.5, 1.0, 1.5, 2.0, 4.0, 8.0]),
+                 'comments': '',
+                 'spent_on': str(spent_on),
+                 'created_on': '{}T12:00:00Z'.format(spent_on),
+                 'updated_on': '{}T12:00:00Z'.format(spent_on)}
+        if issues_by_project.get(project['id']) and rnd.random() < 0.8:
+            entry['issue'] = {'id': rnd.choice(issues_by_project[project['id']])['id']}
+        time_entries.append(entry)
+    # Redmine returns time entries sorted by spent_on, most recent first
+    time_entries.sort(key=lambda e: (e['spent_on'], e['id']), reverse=True)
+    return {'activities': activities, 'roles': roles, 'users': users, 'projects': projects,
+            'memberships': memberships, 'issues': issues, 'time_entries': time_entries}
+
+
+def save_data(data, path):
+    """Write data of generate_data() or record_data() to a JSON fixture file."""
+    with open(path, 'w', encoding='utf-8') as fixture:
+        json.dump(data, fixture)
+
+
+def load_data(path) -> dict:
+    """Read a JSON fixture file written by save_data()."""
+    with open(path, encoding='utf-8') as fixture:
+        data = json.load(fixture)
+    data['memberships'] = {int(project_id): memberships  # JSON object keys are strings
+                           for project_id, memberships in data['memberships'].items()}
+    return data
+
+
+def record_data(url, api_key, from_date, to_date, verify=True) -> dict:
+    """Record the resources the report uses from a live Redmine, in the format of generate_data()."""
+    session = requests.Session()
+    session.headers['X-Redmine-API-Key'] = api_key
+    session.verify = verify
+
+    def get_all(path, container, **params):
+        """Get all pages of a resource list, lists that are not paginated come in one page."""
+        items = []
+        while True:
+            response = session.get(url.rstrip('/') + path, params=dict(params, limit=100, offset=len(items)))
+            response.raise_for_status()
+            body = response.json()
+            items.extend(body[container])
+            if not body[container] or len(items) >= body.get('total_count', 0):
+                return items
+
+    projects = get_all('/projects.json', 'projects')
+    memberships = {project['id']: get_all('/projects/{}/memberships.json'.format(project['id']), 'memberships')
+                   for project in projects}
+    users = {membership['user']['id']: membership['user']
+             for project_memberships in memberships.values()
+             for membership in project_memberships if 'user' in membership}
+    time_entries = get_all('/time_entries.json', 'time_entries', **{'from': str(from_date), 'to': str(to_date)})
+    return {'activities': get_all('/enumerations/time_entry_activities.json', 'time_entry_activities'),
+            'roles': get_all('/roles.json', 'roles'),
+            'users': list(users.values()),
+            'projects': projects,
+            'memberships': memberships,
+            'issues': sorted(get_all('/issues.json', 'issues', status_id='*'), key=lambda issue: issue['id']),
+            'time_entries': time_entries}
+
+
+class FakeRedmine:
+    """Class FakeRedmine for serving generated data over HTTP on localhost.
+
+       data - dictionary produced by generate_data()
+       latency - seconds added to every response to imitate network round trips
+       separate_process - serve from a forked process, so the server does not compete with the client for the GIL.
+                          Where fork is not available, the server runs in a thread anyway
+       request_count - number of requests served so far
+    """
+
+    def __init__(self, data=None, latency=0.0, port=0, separate_process=False):
+        self.data = data if data is not None else generate_data()
+        self.latency = latency
+        self.separate_process = separate_process and 'fork' in multiprocessing.get_all_start_methods()
+        # Shared with the forked server process, if any
+        self._request_count = (multiprocessing.get_context('fork') if self.separate_process
+                               else multiprocessing).Value('L', 0)
+        self._filtered = {}  # Query parameters without limit/offset: filtered resources, so paging stays cheap
+        self._projects = {}
+        for project in self.data['projects']:
+            for key in ('id', 'identifier', 'name'):
+                self._projects[str(project[key])] = project
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self.server.daemon_threads = True
+        self._runner = None
+
+    @property
+    def request_count(self) -> int:
+        return self._request_count.value
+
+    @property
+    def url(self) -> str:
+        return 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+
+    def start(self):
+        """Start serving requests in a background thread or process."""
+        if self.separate_process:
+            self._runner = multiprocessing.get_context('fork').Process(target=self.server.serve_forever, daemon=True)
+        else:
+            self._runner = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._runner.start()
+        return self
+
+    def stop(self):
+        """Shut the server down."""
+        if self.separate_process:
+            self._runner.terminate()
+            self._runner.join()
+        else:
+            self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            wbufsize = 1 << 16  # Headers and body leave in one packet, avoiding delayed ACK stalls
+
+            def do_GET(self):
+                with fake._request_count.get_lock():
+                    fake._request_count.value += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                url = urlsplit(self.path)
+                status, body = fake.route(url.path, dict(parse_qsl(url.query)))
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def route(self, path, params) -> tuple:
+        """Return (status, JSON body) for a request path and its query parameters."""
+        if path == '/enumerations/time_entry_activities.json':
+            return 200, {'time_entry_activities': self.data['activities']}
+        if path == '/roles.json':
+            return 200, {'roles': self.data['roles']}
+        if path == '/projects.json':
+            return 200, self.paginate('projects', self.data['projects'], params)
+        if path.startswith('/projects/') and path.endswith('/memberships.json'):
+            project = self._projects.get(path[len('/projects/'):-len('/memberships.json')])
+            if project is None:
+                return 404, {}
+            return 200, self.paginate('memberships', self.data['memberships'][project['id']], params)
+        if path == '/issues.json':
+            return 200, self.paginate('issues', self.cached(self.filter_issues, params), params)
+        if path == '/time_entries.json':
+            return 200, self.paginate('time_entries', self.cached(self.filter_time_entries, params), params)
+        return 404, {}
+
+    def cached(self, filter_func, params) -> list:
+        key = (filter_func.__name__, frozenset((k, v) for k, v in params.items() if k not in ('limit', 'offset')))
+        if key not in self._filtered:
+            self._filtered[key] = filter_func(params)
+        return self._filtered[key]
+
+    @staticmethod
+    def paginate(container, items, params) -> dict:
+        limit = min(int(params.get('limit', 25)), 100)  # Redmine caps the page size at 100
+        offset = int(params.get('offset', 0))
+        return {container: items[offset:offset + limit], 'total_count': len(items), 'limit': limit, 'offset': offset}
+
+    def _project_filter(self, params):
+        if 'project_id' not in params:
+            return lambda item: True
+        project = self._projects.get(params['project_id'])
+        if project is None:
+            return lambda item: False
+        ids = {project['id']}
+        if params.get('subproject_id') != '!*':
+            ids.update(p['id'] for p in self.data['projects'] if p.get('parent', {}).get('id') in ids)
+        return lambda item: item['project']['id'] in ids
+
+    @staticmethod
+    def _updated_filter(params):
+        value = params.get('updated_on', '')
+        if value.startswith('>='):
+            return lambda item: item['updated_on'] >= value[2:]
+        return lambda item: True
+
+    def filter_issues(self, params) -> list:
+        in_project = self._project_filter(params)
+        updated = self._updated_filter(params)
+        parent_id = params.get('parent_id')
+        result = []
+        for issue in self.data['issues']:
+            if not in_project(issue) or not updated(issue):
+                continue
+            if parent_id == '!*' and 'parent' in issue:
+                continue
+            if parent_id not in (None, '!*') and str(issue.get('parent', {}).get('id')) != parent_id:
+                continue
+            result.append(issue)
+        result.reverse()  # Redmine returns issues sorted by id, most recent first
+        return result
+
+    def filter_time_entries(self, params) -> list:
+        in_project = self._project_filter(params)
+        updated = self._updated_filter(params)
+        issue_id = params.get('issue_id')
+        from_date = params.get('from', '')
+        to_date = params.get('to', '9999')
+        return [entry for entry in self.data['time_entries']
+                if from_date <= entry['spent_on'] <= to_date
+                and in_project(entry) and updated(entry)
+                and (issue_id is None or str(entry.get('issue', {}).get('id')) == issue_id)]
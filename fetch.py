@@ -0,0 +1,89 @@
+"""Module containing the concurrent fetch layer: PooledEngine for python-redmine and the bounded_map helper."""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from redminelib.engines.sync import SyncEngine
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import instrumentation
+try:
+    from local_settings import *
+except ImportError:
+    from settings import *
+
+
+def bounded_map(executor, func, iterable, window):
+    """Apply func to every item in executor, yielding the results in input order.
+
+    At most window calls are in flight at any time, so a long iterable does not flood the executor (backpressure).
+    """
+    pending = deque()
+    for item in iterable:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(func, item))
+    while pending:
+        yield pending.popleft().result()
+
+
+def fetch_pages(engine, url, container, decode=None, **params) -> list:
+    """Get all pages of a Redmine resource list in parallel, bypassing python-redmine resources.
+
+    decode - function turning the JSON dictionaries of a page into records, called as soon as the page arrives,
+             so only the JSON of the pages in flight is held at a time
+    """
+    decode = decode or list
+    first = engine.request('get', url, params=dict(params, limit=engine.chunk, offset=0))
+    results = decode(first[container])
+    if first.get('total_count') is None or not first[container]:  # Not paginated or empty
+        return results
+    limit = first.get('limit') or len(first[container])  # Redmine may cap the page size below the requested one
+    pages = bounded_map(engine.executor,
+                        lambda offset: decode(engine.request('get', url,
+                                                             params=dict(params, limit=limit, offset=offset))[container]),
+                        range(limit, first['total_count'], limit),
+                        engine.workers)
+    for page in pages:
+        results.extend(page)
+    return results
+
+
+def fetch_count(engine, url, **params) -> int:
+    """Get total_count of a Redmine resource list with a single one-item request."""
+    return engine.request('get', url, params=dict(params, limit=1, offset=0))['total_count']
+
+
+class PooledEngine(SyncEngine):
+    """python-redmine engine that keeps a pool of keep-alive connections and fetches result pages in parallel.
+
+    workers - maximum number of simultaneous requests (and pooled connections)
+    Requests answered with 429 or 5xx are retried FETCH_RETRIES times with exponential backoff.
+    """
+
+    def __init__(self, **options):
+        self.workers = max(1, options.pop('workers', FETCH_WORKERS))
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='redmine-page')
+        super().__init__(**options)
+
+    def create_session(self, **params):
+        session = super().create_session(**params)
+        retry = Retry(total=FETCH_RETRIES,
+                      backoff_factor=FETCH_BACKOFF,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset({'GET'}),
+                      raise_on_status=False)  # The last response is handed over to python-redmine error handling
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=self.workers,
+                              pool_block=True,  # Never open more than workers connections
+                              max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.hooks['response'].append(instrumentation.on_response)
+        return session
+
+    def process_bulk_request(self, method, url, container, bulk_params):
+        pages = bounded_map(self.executor,
+                            lambda params: self.request(method, url, params=params)[container],
+                            bulk_params,
+                            self.workers)
+        return [resource for page in pages for resource in page]
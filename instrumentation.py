@@ -0,0 +1,197 @@
+"""Module containing the Profiler collecting timings, HTTP statistics, processed items and memory peaks of a run.
+
+Disabled unless start() is called (see PROFILE_PATH in settings): span() and annotate() then return at once.
+The trace is written as JSON or in the Chrome trace format (chrome://tracing, https://ui.perfetto.dev).
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)  # Upper bounds in seconds, then +inf
+
+profiler = None  # Profiler of the run, None when instrumentation is disabled
+_disabled_span = nullcontext()
+
+
+def endpoint(url) -> str:
+    """Path of a Redmine URL with ids replaced, so requests of the same kind are counted together."""
+    return re.sub(r'/\d+(?=[/.])', '/:id', urlsplit(url).path)
+
+
+class Span:
+    """Class Span for timing a phase, used as a context manager.
+
+       args - details shown with the span, e.g. numbers of processed items
+       peak_memory - most memory traced by tracemalloc during the span (in any thread), if memory is traced
+    """
+    __slots__ = ('profiler', 'name', 'args', 'start', 'duration', 'thread', 'peak_memory')
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+        self.start = None
+        self.duration = None
+        self.thread = threading.get_ident()
+        self.peak_memory = None
+
+    def __enter__(self):
+        stack = self.profiler.stack()
+        if self.profiler.memory:
+            self.profiler.fold_peak()
+            self.peak_memory = tracemalloc.get_traced_memory()[0]
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration = time.perf_counter() - self.start
+        if self.profiler.memory:
+            self.profiler.fold_peak()
+        self.profiler.stack().pop()
+        self.profiler.spans.append(self)
+
+
+class Profiler:
+    """Class Profiler for collecting what happens during a run.
+
+       spans - finished Spans in the order they ended
+       http - {endpoint: {'count', 'bytes', 'seconds', 'histogram'}} of HTTP requests
+       memory - trace memory with tracemalloc, which slows Python down noticeably
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.http = defaultdict(lambda: {'count': 0, 'bytes': 0, 'seconds': 0.0,
+                                         'histogram': [0] * (len(LATENCY_BUCKETS) + 1)})
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stack(self) -> list:
+        """Open spans of the current thread, innermost last."""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def fold_peak(self):
+        """Carry the memory peak since the last call over to the open spans of the current thread.
+
+        tracemalloc keeps a single process-wide peak, so it is reset at every span boundary. tracemalloc.reset_peak
+        is new in Python 3.9, before that a span gets the peak of the whole run up to its end.
+        """
+        peak = tracemalloc.get_traced_memory()[1]
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        for span in self.stack():
+            span.peak_memory = max(span.peak_memory, peak)
+
+    def on_response(self, response, *args, **kwargs):
+        """requests response hook counting the request, its size and latency by endpoint."""
+        self.record_request(response.url, len(response.content), response.elapsed.total_seconds())
+
+    def record_request(self, url, size, seconds):
+        with self._lock:
+            stats = self.http[endpoint(url)]
+            stats['count'] += 1
+            stats['bytes'] += size
+            stats['seconds'] += seconds
+            stats['histogram'][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def summary(self) -> dict:
+        """Spans, HTTP statistics and derived rates as JSON-ready dictionaries."""
+        spans = []
+        for span in sorted(self.spans, key=lambda s: s.start):
+            item = {'name': span.name,
+                    'start': round(span.start - self.origin, 6),
+                    'seconds': round(span.duration, 6),
+                    'thread': span.thread}
+            item.update(span.args)
+            for key, value in span.args.items():  # Items processed per second
+                if isinstance(value, int) and span.duration > 0:
+                    item[key + '_per_second'] = round(value / span.duration, 1)
+            if span.peak_memory is not None:
+                item['peak_memory'] = span.peak_memory
+            spans.append(item)
+        http = {}
+        for name, stats in sorted(self.http.items()):
+            http[name] = dict(stats,
+                              seconds=round(stats['seconds'], 6),
+                              mean_seconds=round(stats['seconds'] / stats['count'], 6),
+                              histogram=dict(zip(['<={}'.format(bound) for bound in LATENCY_BUCKETS] + ['>'],
+                                                 stats['histogram'])))
+        return {'spans': spans, 'http': http}
+
+    def chrome_trace(self) -> dict:
+        """Spans as complete events and HTTP statistics as metadata of the Chrome trace format."""
+        pid = os.getpid()
+        events = [{'name': span.name, 'ph': 'X', 'pid': pid, 'tid': span.thread,
+                   'ts': (span.start - self.origin) * 1e6, 'dur': span.duration * 1e6,
+                   'args': dict(span.args, **({'peak_memory': span.peak_memory}
+                                              if span.peak_memory is not None else {}))}
+                  for span in self.spans]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'http': self.summary()['http']}}
+
+    def write(self, path, trace_format='json'):
+        data = self.chrome_trace() if trace_format == 'chrome' else self.summary()
+        with open(path, 'w', encoding='utf-8') as trace_file:
+            json.dump(data, trace_file, indent=1)
+
+
+def start(memory=False) -> Profiler:
+    """Enable instrumentation."""
+    global profiler
+    profiler = Profiler(memory=memory)
+    return profiler
+
+
+def stop(path=None, trace_format='json'):
+    """Disable instrumentation, writing the trace to path if given."""
+    global profiler
+    if profiler is None:
+        return
+    if path:
+        profiler.write(path, trace_format)
+    if profiler.memory:
+        tracemalloc.stop()
+    profiler = None
+
+
+def span(name, **args):
+    """Context manager timing a phase. args are shown with it, e.g. span('walk', issues=len(issues))."""
+    if profiler is None:
+        return _disabled_span
+    return Span(profiler, name, args)
+
+
+def annotate(**args):
+    """Add details to the innermost open span of the current thread, e.g. annotate(entries=len(entries))."""
+    if profiler is None:
+        return
+    stack = profiler.stack()
+    if stack:
+        stack[-1].args.update(args)
+
+
+def on_response(response, *args, **kwargs):
+    """requests response hook, counts the request if instrumentation is enabled."""
+    if profiler is not None:
+        profiler.on_response(response)
+
+
+def record_request(url, size, seconds):
+    """Count a request made without requests (e.g. with aiohttp) if instrumentation is enabled."""
+    if profiler is not None:
+        profiler.record_request(url, size, seconds)
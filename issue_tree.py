@@ -1,7 +1,7 @@
 """Module containing IssueTree, IssueNode classes for storing information about bugtracker issues."""
 
+import gc
 from collections import defaultdict
-from functools import partial
 
 
 class IssueNode:
@@ -9,10 +9,13 @@ class IssueNode:
 
        issue_id - id of the bugtracker issue associated with the node
        store - dictionary for {user: {activity: hours}} structure
+       total - the same structure for the node and all its descendants, None until IssueTree.aggregate is called
        parent - parent IssueNode
-       children - list of child IssueNodes
+       children - list of child IssueNodes (an empty tuple until the first child is added)
        level - level in the hierarchy, root IssueNodes have level=0
     """
+    __slots__ = ('parent', 'level', 'issue_id', 'subject', 'store', 'total', 'children')
+
     def __init__(self, issue_id, subject, parent):
         self.parent = parent
         if parent:
@@ -21,51 +24,134 @@ class IssueNode:
             self.level = 0
         self.issue_id = issue_id
         self.subject = subject
-        self.store = defaultdict(partial(defaultdict, int))
-        self.children = []
+        self.store = {}
+        self.total = None
+        self.children = ()  # Most nodes are leaves, they share the empty tuple instead of owning a list
+
+    def add_child(self, child):
+        if self.children:
+            self.children.append(child)
+        else:
+            self.children = [child]
 
     def add_data(self, user, activity, hours):
         """Update an issue node with new time entry data."""
-        self.store[user][activity] += hours
+        user_store = self.store.get(user)
+        if user_store is None:
+            user_store = self.store[user] = {}
+        user_store[activity] = user_store.get(activity, 0) + hours
+
+    def walk(self):
+        """Iterate over the node and its descendants in depth-first order."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
 
     def __str__(self):
-        children_str = ''
-        for child in self.children:
-            children_str += '\n' + child.__str__()
-        return '--'*self.level + '|' + str(self.issue_id) + '| ' + self.store.__str__() + '\n' + children_str
+        lines = []
+        for node in self.walk():
+            lines.append('--'*node.level + '|' + str(node.issue_id) + '| ' + str(node.store) + '\n')
+        return '\n'.join(lines)
 
 
 class IssueTree:
     """IssueTree class for storing data associated with bugtracker issues.
 
        roots - list of all root elements (class IssueNode)
-       leaves - list of all leaf elements (class IssueNode)
+       leaves - all leaf elements (class IssueNode), a dictionary used as an ordered set
+       nodes - dictionary {issue id: IssueNode}
     """
 
     def __init__(self):
         self.roots = []
-        self.leaves = []
+        self.leaves = {}
+        self.nodes = {}
 
     def init_node(self, issue_id, subject, parent=None) -> IssueNode:
         """Initialize a new node."""
         if parent:  # Parent issue exists
-            parent.children.append(IssueNode(issue_id=issue_id,
-                                             subject=subject,
-                                             parent=parent))
-            if parent in self.leaves:
-                self.leaves.remove(parent)
-            self.leaves.append(parent.children[-1])
-            return parent.children[-1]
+            new_node = IssueNode(issue_id=issue_id,
+                                 subject=subject,
+                                 parent=parent)
+            parent.add_child(new_node)
+            self.leaves.pop(parent, None)
         else:  # No parent issue
-            new_root = IssueNode(issue_id=issue_id,
+            new_node = IssueNode(issue_id=issue_id,
                                  subject=subject,
                                  parent=parent)
-            self.roots.append(new_root)
-            self.leaves.append(new_root)
-            return new_root
+            self.roots.append(new_node)
+        self.leaves[new_node] = None
+        self.nodes[issue_id] = new_node
+        return new_node
 
-    def __str__(self) -> str:
-        roots_str = ''
+    def build(self, issues, depth=None):
+        """Build the tree in one pass from a flat list of (issue_id, subject, parent_id) tuples.
+
+        Issues whose parent is not in the list become roots, roots and children keep the order of the list.
+        Issues deeper than depth (root level is 0) get no node of their own: nodes maps them to their ancestor
+        at that depth.
+        """
+        issues = list(issues)
+        ids = {issue_id for issue_id, _, _ in issues}
+        children = defaultdict(list)
+        roots = []
+        for issue in issues:
+            if issue[2] in ids:
+                children[issue[2]].append(issue)
+            else:
+                roots.append(issue)
+        # Depth-first traversal with an explicit stack, so deep hierarchies cannot exhaust the call stack.
+        # Parent <-> child references make every node part of a cycle, and the cyclic garbage collector would keep
+        # rescanning the growing tree while nothing in it can be collected yet, so it is paused meanwhile.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            stack = [(issue, None) for issue in reversed(roots)]
+            while stack:
+                (issue_id, subject, _), parent = stack.pop()
+                if parent is not None and depth is not None and parent.level >= depth:
+                    node = parent  # Too deep, the issue is represented by its ancestor
+                    self.nodes[issue_id] = node
+                else:
+                    node = self.init_node(issue_id, subject, parent)
+                node_children = children.pop(issue_id, None)
+                if node_children:
+                    stack.extend((child, node) for child in reversed(node_children))
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return self
+
+    def walk(self):
+        """Iterate over all nodes in depth-first order."""
         for root in self.roots:
-            roots_str += root.__str__()
-        return roots_str
+            yield from root.walk()
+
+    def aggregate(self):
+        """Compute total of every node in a single bottom-up pass over the tree.
+
+        Call it once all time entries have been added. To save memory a total is shared with the store of the node
+        or the total of its only child where nothing has to be added, so totals must not be modified.
+        """
+        for node in reversed(list(self.walk())):  # Children come after their parents in depth-first order
+            parts = [child.total for child in node.children if child.total]
+            if not parts:
+                node.total = node.store
+            elif not node.store and len(parts) == 1:
+                node.total = parts[0]
+            else:
+                total = {}
+                for part in [node.store] + parts:
+                    for user, activities in part.items():
+                        user_total = total.get(user)
+                        if user_total is None:
+                            total[user] = dict(activities)
+                        else:
+                            for activity, hours in activities.items():
+                                user_total[activity] = user_total.get(activity, 0) + hours
+                node.total = total
+
+    def __str__(self) -> str:
+        return ''.join(str(root) for root in self.roots)
@@ -2,55 +2,157 @@ try:
     from local_settings import *
 except ImportError:
     from settings import *
-from report import Report
 from redmine_manager import RedmineManager
+import instrumentation
 from datetime import date, timedelta
+from os import path
 
 
-if __name__ == '__main__':
-    rmman = RedmineManager()
-    rmman.connect()
-    if TO_DATE and FROM_DATE:
-        rmman.set_time_interval(from_date=FROM_DATE,
-                                to_date=TO_DATE)
+def report_filename(filename=FILENAME, output_format=OUTPUT_FORMAT) -> str:
+    """Path a report of output_format is written to: filename, with the extension of the format unless it is a PDF."""
+    if output_format == 'pdf':
+        return filename
+    return path.splitext(filename)[0] + '.' + output_format
+
+
+def create_report(filename=FILENAME, output_format=OUTPUT_FORMAT, lang=LANG):
+    """Create a report writer for output_format. reportlab is only imported for PDF output.
+
+    PDF reports are single documents, or ParallelReports rendering projects in separate processes.
+    lang - language of the text the writer adds itself, the table of contents of a ParallelReport
+    """
+    if output_format != 'pdf':
+        from exporters import EXPORTERS
+        report = EXPORTERS[output_format]()
+        report.create(filename=report_filename(filename, output_format))
+        return report
+    if RENDER_WORKERS > 1:
+        from report_pool import ParallelReport  # Requires pypdf
+        report = ParallelReport(workers=RENDER_WORKERS, lang=lang)
     else:
-        rmman.set_time_interval(from_date=date.today() - timedelta(days=NUM_DAYS),
-                                to_date=date.today())
+        from report import Report
+        report = Report()
+    report.create(filename=filename)
+    return report
 
-    rmman.get_roles()  # Get role and activity information, process exceptions defined in settings
-    rmman.get_projects()  # Get all projects
-    rmman.get_project_time()  # Get project time entries for each project
 
-    report = Report()  # Initialize the report
-    report.create(filename=FILENAME)
+def add_project_time(report, rmman, instance=INSTANCE_REPORT, rollup=PROJECT_ROLLUP):
+    """Add the report title and the time spent on every project.
+
+    instance - start with the time spent on all projects, then list the projects as a hierarchy
+    rollup - with instance, include the time spent on subprojects in the table of a project
+    """
+    add_title(report, rmman)
+    if instance:
+        add_summary(report, rmman)
+        tree = rmman.project_tree()  # Subprojects follow their parent from now on
+    add_projects_title(report, rmman, rollup=instance and rollup)
+    for project in rmman.projects:
+        add_project_table(report, rmman, project,
+                          dictionary=tree.nodes[project.project.id].total if instance and rollup else None)
+    add_issues_title(report, rmman)
 
+
+def add_title(report, rmman):
+    """Add the report title and the time interval."""
     report.add_text(text='Redmine',
                     header=1,
                     space_after=0.05)
-    report.add_text(text=REPORT_MESSAGES['resource_info'][LANG].format(rmman.from_date, rmman.to_date),
+    report.add_text(text=REPORT_MESSAGES['resource_info'][rmman.lang].format(rmman.from_date, rmman.to_date),
+                    space_after=0.2)
+
+
+def add_projects_title(report, rmman, rollup=False):
+    """Add the header of the project tables."""
+    report.add_text(text=REPORT_MESSAGES['project_rollup_spent_time' if rollup else 'project_spent_time'][rmman.lang],
                     space_after=0.2)
-    report.add_text(text=REPORT_MESSAGES['project_spent_time'][LANG],
+
+
+def add_summary(report, rmman):
+    """Add the time spent on all projects and their issues."""
+    report.add_text(text=REPORT_MESSAGES['instance_spent_time'][rmman.lang],
                     space_after=0.2)
+    report.add_table(rmman.summary_table())
+    report.add_space()
+
+
+def add_project_table(report, rmman, project, dictionary=None):
+    """Add the time spent on the project, or the time in dictionary if given (e.g. including subprojects)."""
+    table = rmman.gen_report_table(label=project.name,
+                                   dictionary=project.time_entries if dictionary is None else dictionary)
+    report.add_table(table)
+    report.add_space()
 
-    for project in rmman.projects:
-        table = rmman.gen_report_table(label=project.name,
-                                       dictionary=project.time_entries)
-        report.add_table(table)
-        report.add_space()
 
+def add_issues_title(report, rmman):
+    """Add the header of the issue sections, which follow the project tables."""
     report.add_space()
-    report.add_text(REPORT_MESSAGES['root_issues_spent_time'][LANG],
+    report.add_text(REPORT_MESSAGES['root_issues_spent_time'][rmman.lang],
                     space_after=0.05)
 
-    rmman.get_issues()
-    for project in rmman.projects:
-        report.add_text(text=REPORT_MESSAGES['project'][LANG] + ' ' + project.name,
-                        header=2,
-                        space_after=0.1)
-        for issue_table in project.issue_tables_gen:
-            report.add_header(issue_table[0])  # Issue subject used as a header
-            report.add_table(issue_table[1])  # Data table
-            report.add_space()
-
-    report.build()
+
+def add_issue_time(report, project, lang=LANG):
+    """Add the time spent on root issues of the project."""
+    report.add_text(text=REPORT_MESSAGES['project'][lang] + ' ' + project.name,
+                    header=2,
+                    space_after=0.1)
+    for issue_table in project.issue_tables_gen:
+        report.add_header(issue_table[0])  # Issue subject used as a header
+        report.add_table(issue_table[1])  # Data table
+        report.add_space()
+
+
+def get_project_time(rmman):
+    """Get time entries of the time interval and the time spent on every project."""
+    if BULK_FETCH or INSTANCE_REPORT or rmman.cache:
+        rmman.get_time_entries()  # Get all time entries of the period at once
+    rmman.get_project_time()  # Get project time entries for each project
+
+
+def write_report(report, rmman, issues=None):
+    """Write the time spent on projects and on their issues into the report.
+
+    issues - {project id: [(issue id, subject, parent id)]} fetched beforehand, see RedmineManager.fetch_issues
+    """
+    rmman.get_issues(issues=issues)  # Issue trees are filled before the summary of INSTANCE_REPORT needs them
+    rmman.release_time_entries()
+
+    with instrumentation.span('add_project_time', projects=len(rmman.projects)):
+        add_project_time(report, rmman)
+    with instrumentation.span('add_issue_time', projects=len(rmman.projects)):
+        for project in rmman.projects:
+            report.start_section(REPORT_MESSAGES['project'][rmman.lang] + ' ' + project.name)
+            add_issue_time(report, project, rmman.lang)
+            if report.streaming:  # Tables of the project are in the report already
+                project.issue_tree = None
+
+    with instrumentation.span(type(report).__name__ + '.build'):
+        report.build()
+
+
+if __name__ == '__main__':
+    if PROFILE_PATH:
+        instrumentation.start(memory=PROFILE_MEMORY)
+    if TO_DATE and FROM_DATE:
+        from_date, to_date = FROM_DATE, TO_DATE
+    else:
+        from_date, to_date = date.today() - timedelta(days=NUM_DAYS), date.today()
+
+    if ASYNC_FETCH:
+        import asyncio
+        from async_manager import generate_report  # Requires aiohttp
+        asyncio.run(generate_report(create_report(), from_date=from_date, to_date=to_date))
+    else:
+        rmman = RedmineManager()
+        rmman.connect()
+        rmman.set_time_interval(from_date=from_date,
+                                to_date=to_date)
+
+        rmman.get_roles()  # Get role and activity information, process exceptions defined in settings
+        rmman.get_projects()  # Get all projects
+        get_project_time(rmman)
+
+        report = create_report()  # Initialize the report
+        write_report(report, rmman)
+    instrumentation.stop(PROFILE_PATH, PROFILE_FORMAT)
     print('Report generated.')
@@ -0,0 +1,90 @@
+"""Module containing slim records of the Redmine resources the report uses, decoded straight from JSON.
+
+python-redmine resources keep the whole JSON of a resource and build a new object for every nested resource on access.
+Records keep only the fields the report reads in __slots__, and references to the same user, activity, project or
+issue are shared between records. Optional references are left unset like in python-redmine resources,
+so hasattr(entry, 'issue') works for both.
+"""
+
+from datetime import date
+
+
+class Ref:
+    """Class Ref for a reference to another resource, e.g. the user or the activity of a time entry."""
+    __slots__ = ('id', 'name')
+
+    def __init__(self, ref_id, name=None):
+        self.id = ref_id
+        self.name = name
+
+
+class Refs:
+    """Class Refs for sharing one Ref per referenced resource between all decoded records."""
+
+    def __init__(self):
+        self.tables = {kind: {} for kind in ('project', 'issue', 'user', 'activity')}
+
+    def get(self, kind, item) -> Ref:
+        table = self.tables[kind]
+        found = table.get(item['id'])
+        if found is None:
+            found = table.setdefault(item['id'], Ref(item['id'], item.get('name')))
+        return found
+
+
+class ProjectRecord:
+    """Class ProjectRecord for the fields of a project the report uses.
+
+       parent - Ref of the parent project, unset for top-level projects
+    """
+    __slots__ = ('id', 'name', 'identifier', 'parent')
+
+    def __init__(self, item):
+        self.id = item['id']
+        self.name = item['name']
+        self.identifier = item.get('identifier', '')
+        if 'parent' in item:
+            self.parent = Ref(item['parent']['id'], item['parent'].get('name'))
+
+
+class TimeEntryRecord:
+    """Class TimeEntryRecord for the fields of a time entry the report uses.
+
+       issue - Ref of the issue, unset for time not spent on an issue
+    """
+    __slots__ = ('id', 'project', 'issue', 'user', 'activity', 'hours', 'spent_on')
+
+    def __init__(self, item, refs):
+        self.id = item['id']
+        self.project = refs.get('project', item['project'])
+        if 'issue' in item:
+            self.issue = refs.get('issue', item['issue'])
+        self.user = refs.get('user', item['user'])
+        self.activity = refs.get('activity', item['activity'])
+        self.hours = item['hours']
+        self.spent_on = date.fromisoformat(item['spent_on'])
+
+
+def decode_projects(items) -> list:
+    return [ProjectRecord(item) for item in items]
+
+
+def decode_time_entries(items, refs) -> list:
+    return [TimeEntryRecord(item, refs) for item in items]
+
+
+def decode_issues(items) -> list:
+    """(issue id, subject, parent id) tuples, as IssueTree.build takes them."""
+    return [(item['id'], item.get('subject', ''), item['parent']['id'] if 'parent' in item else None)
+            for item in items]
+
+
+def decode_project_issues(items) -> list:
+    """(project id, (issue id, subject, parent id)) pairs, for grouping issues of all projects."""
+    return [(item['project']['id'], issue) for item, issue in zip(items, decode_issues(items))]
+
+
+def decode_memberships(items) -> list:
+    """(user name, {role names}) pairs of project memberships. Memberships of groups are skipped."""
+    return [(item['user']['name'], {role['name'] for role in item['roles'] if 'name' in role})
+            for item in items if 'user' in item and 'roles' in item]
@@ -1,4 +1,5 @@
 from redminelib import Redmine
+from concurrent.futures import ThreadPoolExecutor
 try:
     from local_settings import *
 except ImportError:
@@ -6,6 +7,12 @@ except ImportError:
 from issue_tree import IssueTree
 from operator import add
 from decorators import timetrack, suppress_warnings
+from fetch import PooledEngine, bounded_map, fetch_pages
+from cache import RedmineCache
+from activity_resolver import ActivityResolver
+from aggregates import HourBuckets
+from records import Refs, decode_issues, decode_project_issues, decode_projects, decode_time_entries, decode_memberships
+import instrumentation
 from collections import defaultdict
 from functools import partial
 
@@ -16,7 +23,6 @@ class RedmineProject:
         self.project = project
         self.name = project.name
         self.time_entries = defaultdict(partial(defaultdict, int))
-        self.issues = []
         self.issue_tree = None
         self.issue_tables_gen = None
         self.user_roles = {}  # Username: {set of roles} pairs
@@ -27,13 +33,27 @@ class RedmineManager:
 
     def __init__(self):
         self.redmine = None
+        self.executor = None  # Runs per-project and per-issue queries in parallel
+        self.workers = 1
+        self.cache = None  # RedmineCache, if resources are kept between runs
+        self.refs = Refs()  # Users, activities, projects and issues referenced by time entry records
         self.activities = None
         self.reported_activities = None
         self.roles = None
         self.role_act_map = None
+        self.resolver = None  # ActivityResolver compiled by get_projects
         self.projects = []  # List of RedmineProject objects
         self.from_date = None
         self.to_date = None
+        self.lang = LANG  # Language of the table labels
+        self.project_entries = None  # Project id: [time entries not bound to an issue], filled by get_time_entries
+        self.issue_entries = None  # Issue id: [time entries], filled by get_time_entries
+        self.columns = None  # TimeEntryColumns filled by get_time_entries instead of the index with the 'numpy' backend
+        self.resolved_activities = None  # Activity codes of the columns after applying ROLE_ACT_EXCEPTIONS
+        # Project id: [(user, activity, hours) not bound to an issue] and issue id: [(user, activity, hours)],
+        # summed from HourBuckets by get_time_entries instead of the index
+        self.project_hours = None
+        self.issue_hours = None
 
     def set_time_interval(self, from_date, to_date):
         """Set time boundaries for time tracking."""
@@ -41,83 +61,308 @@ class RedmineManager:
         self.to_date = to_date
 
     @suppress_warnings
-    def connect(self, url=REDMINE_URL, api_key=REDMINE_KEY):
-        """Connect to Redmine."""
+    def connect(self, url=REDMINE_URL, api_key=REDMINE_KEY, workers=FETCH_WORKERS, cache_path=CACHE_PATH):
+        """Connect to Redmine, open the cache if cache_path is set."""
         verify = False if SUPPRESS_WARNINGS else CERT_PATH
         self.redmine = Redmine(url=url,
                                key=api_key,
-                               requests={'verify': verify})
+                               requests={'verify': verify},
+                               engine=PooledEngine,
+                               workers=workers)
+        self.redmine.engine.chunk = FETCH_PAGE_SIZE
+        self.workers = max(1, workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='redmine-query')
+        if cache_path:
+            self.cache = RedmineCache(self.redmine, path=cache_path, executor=self.executor)
+
+    def spawn(self, reference=True, cache=True):
+        """Create a RedmineManager sharing the connection and worker pools, e.g. for another time interval.
+
+        reference - share roles, activities, projects and refs too, otherwise get_roles and get_projects have to be
+                    called. Without them refs start empty, so users and activities renamed since get their new names
+        cache - open the cache, if this manager has one
+        Time entries, issues and tables are kept separately, so managers can gather data concurrently.
+        """
+        rmman = RedmineManager()
+        rmman.redmine = self.redmine
+        rmman.executor = self.executor
+        rmman.workers = self.workers
+        rmman.lang = self.lang
+        if self.cache and cache:
+            rmman.cache = RedmineCache(self.redmine, path=self.cache.path,  # SQLite connection of its own
+                                       executor=self.executor)
+        if reference:
+            rmman.refs = self.refs
+            rmman.activities = self.activities
+            rmman.reported_activities = self.reported_activities
+            rmman.roles = self.roles
+            rmman.role_act_map = self.role_act_map
+            rmman.resolver = self.resolver
+            for project in self.projects:
+                rmman.projects.append(RedmineProject(project.project))
+                rmman.projects[-1].user_roles = project.user_roles
+        return rmman
+
+    def parallel_map(self, func, iterable) -> list:
+        """Apply func to every item using the worker pool, keeping the order of the results."""
+        return list(bounded_map(self.executor, func, iterable, self.workers))
+
+    def fetch_json(self, path, container, decode=None, **params) -> list:
+        """Get all pages of a Redmine resource list as JSON dictionaries, or as records if decode is given."""
+        return fetch_pages(self.redmine.engine, self.redmine.url + path, container, decode, **params)
+
+    def time_entry_records(self, items) -> list:
+        return decode_time_entries(items, self.refs)
 
     @suppress_warnings
     @timetrack('Getting roles and activities')
-    def get_roles(self):
-        """Get lists of roles and activties, create (role, activity) -> new_activity mapping."""
+    def get_roles(self, refresh=False):
+        """Get lists of roles and activties, create (role, activity) -> new_activity mapping.
+
+        refresh - fetch them from Redmine even if the cache holds them for less than CACHE_REFERENCE_TTL hours
+        """
+        if self.cache:
+            activities = self.cache.activities(force=refresh)
+            roles = self.cache.roles(force=refresh)
+        else:
+            activities = self.fetch_json('/enumerations/time_entry_activities.json', 'time_entry_activities')
+            roles = self.fetch_json('/roles.json', 'roles')
         # All Redmine user activities
-        self.activities = [activity.name for activity in
-                           self.redmine.enumeration.filter(resource='time_entry_activities')]
+        self.activities = [activity['name'] for activity in activities]
         # ALl Redmine user roles
-        self.roles = [role.name for role in self.redmine.role.all()]
+        self.roles = [role['name'] for role in roles]
+        self.apply_activity_settings()
+
+    def apply_activity_settings(self, role_act_exceptions=ROLE_ACT_EXCEPTIONS, excluded_activities=EXCLUDED_ACTIVITIES):
+        """Create (role, activity) -> new_activity mapping and the list of reported activities."""
         # Role-activity mapping that enables activity override. Default: nothing is overriden
         self.role_act_map = {(role, activity): activity for role in self.roles for activity in self.activities}
         # For some (role, activity) pairs the resulting activity in the report may be different
-        for exception in ROLE_ACT_EXCEPTIONS.keys():
-            self.role_act_map[exception] = ROLE_ACT_EXCEPTIONS[exception]
+        for exception in role_act_exceptions.keys():
+            self.role_act_map[exception] = role_act_exceptions[exception]
         # A subset of all activities used for reporting
-        self.reported_activities = [activity for activity in self.activities if activity not in EXCLUDED_ACTIVITIES]
+        self.reported_activities = [activity for activity in self.activities if activity not in excluded_activities]
 
     @suppress_warnings
     @timetrack('Getting projects')
-    def get_projects(self):
-        """Get all Redmine projects, including project memberships."""
-        for project in self.redmine.project.all():
+    def get_projects(self, refresh=False):
+        """Get all Redmine projects, including project memberships.
+
+        refresh - fetch them from Redmine even if the cache holds them for less than CACHE_REFERENCE_TTL hours
+        """
+        if self.cache:
+            projects = decode_projects(self.cache.projects(force=refresh))
+            cached_memberships = self.cache.memberships([project.id for project in projects], force=refresh)
+            memberships = [decode_memberships(cached_memberships[project.id]) for project in projects]
+        else:
+            projects = self.fetch_json('/projects.json', 'projects', decode=decode_projects)
+            # Redmine has no list of the memberships of all projects, so they are requested for all projects in parallel
+            memberships = self.parallel_map(lambda project: self.fetch_json(
+                '/projects/{}/memberships.json'.format(project.id), 'memberships', decode=decode_memberships), projects)
+        for project, project_memberships in zip(projects, memberships):
             self.projects.append(RedmineProject(project))
-            for pm in project.memberships:
-                if hasattr(pm, 'user') and hasattr(pm, 'roles'):
-                    self.projects[-1].user_roles[pm.user.name] = {role.name for role in pm.roles if hasattr(role, 'name')}
+            self.projects[-1].user_roles = dict(project_memberships)
+        self.compile_resolver()
+
+    def compile_resolver(self):
+        """Compile resulting activity tables of all projects, roles and activities must be known already."""
+        self.resolver = ActivityResolver(self.activities, self.calculate_activity).compile(self.projects)
+
+    def fetch_time_entries(self, decode=None) -> list:
+        """Get all time entries of the time interval, from the cache (brought up to date first) or from Redmine.
+
+        decode - function turning a list of JSON time entries into a list of what is kept, records by default
+        """
+        decode = decode or self.time_entry_records
+        if self.cache:
+            self.cache.sync_time_entries(self.from_date, self.to_date)
+            return decode(self.cache.time_entries(self.from_date, self.to_date))
+        return self.fetch_json('/time_entries.json', 'time_entries', decode=decode,
+                               **{'from': str(self.from_date), 'to': str(self.to_date)})
+
+    @suppress_warnings
+    @timetrack('Getting all time entries')
+    def get_time_entries(self, backend=AGGREGATION_BACKEND, time_entries=None):
+        """Get all time entries of the time interval in one paginated sweep, index them by project and issue.
+
+        Once the index is filled, get_project_time and walk take time entries from memory instead of Redmine.
+        With the 'numpy' backend time entries are decoded from JSON straight into TimeEntryColumns instead.
+        With the cache and CACHE_AGGREGATES, hours are summed from pre-aggregated buckets instead.
+        time_entries - records of the interval fetched beforehand, used instead of fetching them. They are always
+                       indexed: turning records into columns costs more than the columns save
+        """
+        if time_entries is None and self.cache and CACHE_AGGREGATES:
+            self.cache.sync_time_entries(self.from_date, self.to_date)
+            buckets = HourBuckets(self.cache)
+            buckets.update()
+            self.project_hours = defaultdict(list)
+            self.issue_hours = defaultdict(list)
+            rows = buckets.hours(self.from_date, self.to_date)
+            instrumentation.annotate(rows=len(rows))
+            for project_id, issue_id, user, activity, hours in rows:
+                if issue_id:
+                    self.issue_hours[issue_id].append((user, activity, hours))
+                else:
+                    self.project_hours[project_id].append((user, activity, hours))
+            return
+        if time_entries is None and backend == 'numpy':
+            from columnar import TimeEntryColumns  # NumPy is an optional dependency
+            self.columns = TimeEntryColumns()
+            self.columns.extend(self.fetch_time_entries(decode=self.columns.decode_page))
+            instrumentation.annotate(entries=len(self.columns))
+            self.resolved_activities = self.columns.resolve_activities(self.resolver.resolve)
+            return
+        if time_entries is None:
+            time_entries = self.fetch_time_entries()
+        self.project_entries = defaultdict(list)
+        self.issue_entries = defaultdict(list)
+        count = 0
+        for count, entry in enumerate(time_entries, 1):
+            if hasattr(entry, 'issue'):
+                self.issue_entries[entry.issue.id].append(entry)
+            else:
+                self.project_entries[entry.project.id].append(entry)
+        instrumentation.annotate(entries=count)
+
+    def project_time_entries(self, project):
+        """Get time entries of the project (not of its subprojects), from the index if it has been filled."""
+        if self.project_entries is not None:
+            return self.project_entries.get(project.project.id, [])
+        return self.fetch_json('/time_entries.json', 'time_entries', decode=self.time_entry_records,
+                               project_id=project.project.id,
+                               subproject_id='!*',  # Not in a subproject
+                               **{'from': str(self.from_date), 'to': str(self.to_date)})
+
+    def issue_time_entries(self, issue_id):
+        """Get time entries of the issue, from the index if it has been filled."""
+        if self.issue_entries is not None:
+            return self.issue_entries.get(issue_id, [])
+        return self.fetch_json('/time_entries.json', 'time_entries', decode=self.time_entry_records,
+                               issue_id=issue_id,
+                               **{'from': str(self.from_date), 'to': str(self.to_date)})
 
     @suppress_warnings
     @timetrack('Getting time entries for all projects')
     def get_project_time(self):
         """Get project spent time."""
-        for project in self.projects:
-            time_entries = self.redmine.time_entry.filter(project_id=project.name,
-                                                          subproject_id='!*',  # Not in a subproject
-                                                          from_date=self.from_date,
-                                                          to_date=self.to_date)
-            for entry in time_entries:
-                # Time spent on the project (and not its issues)
-                if entry.user.name in project.user_roles:  # This may be not the case if the user has been excluded from the project
-                    set_of_roles = project.user_roles[entry.user.name]
-                    resulting_activity = self.calculate_activity(set_of_roles, entry.activity.name)
-                else:
-                    resulting_activity = entry.activity.name
-                if not hasattr(entry, 'issue'):
-                    project.time_entries[entry.user.name][resulting_activity] += entry.hours
+        instrumentation.annotate(projects=len(self.projects))
+        if self.columns is not None:
+            project_codes = self.columns.map_values(self.columns.project,
+                                                    {project.project.id: code for code, project in enumerate(self.projects)})
+            project_codes[self.columns.issue != 0] = -1  # Time spent on the project (and not its issues)
+            tables = self.columns.group_sum(project_codes, self.resolved_activities)
+            for code, project in enumerate(self.projects):
+                for user, activities in tables.get(code, {}).items():
+                    project.time_entries[user].update(activities)
+            return
+        if self.project_hours is not None:
+            for project in self.projects:
+                overrides = self.resolver.project_overrides(project.project.id)
+                for user, activity, hours in self.project_hours.get(project.project.id, []):
+                    project.time_entries[user][overrides.get((user, activity), activity)] += hours
+            return
+        time_entries = self.parallel_map(lambda project: list(self.project_time_entries(project)), self.projects)
+        for project, project_entries in zip(self.projects, time_entries):
+            overrides = self.resolver.project_overrides(project.project.id)
+            for entry in project_entries:
+                if hasattr(entry, 'issue'):  # Only time spent on the project (and not its issues)
+                    continue
+                user, activity = entry.user.name, entry.activity.name
+                project.time_entries[user][overrides.get((user, activity), activity)] += entry.hours
+
+    def fetch_issues(self) -> dict:
+        """Get {project id: [(issue id, subject, parent id) of the project, not of its subprojects]} for all projects."""
+        if self.cache:
+            self.cache.sync_issues()
+            return {project.project.id: decode_issues(self.cache.issues(project.project.id))
+                    for project in self.projects}
+        if BULK_FETCH or INSTANCE_REPORT:  # Issues of all projects in one paginated sweep
+            issues_by_project = defaultdict(list)
+            for project_id, issue in self.fetch_json('/issues.json', 'issues', decode=decode_project_issues,
+                                                     status_id='*'):  # Get issues in any status
+                issues_by_project[project_id].append(issue)
+            return issues_by_project
+        return dict(zip((project.project.id for project in self.projects),
+                        self.parallel_map(self.get_project_issues, self.projects)))
 
     @suppress_warnings
     @timetrack('Getting issue time entries')
-    def get_issues(self):
-        """Get Redmine issues."""
+    def get_issues(self, depth=ISSUE_TREE_DEPTH, issues=None):
+        """Get Redmine issues, build an IssueTree of every project and fill it with time entries.
+
+        issues - {project id: [(issue id, subject, parent id)]} fetched beforehand, used instead of fetching them
+        Issues are not kept once the trees are built, the trees hold what the report needs.
+        """
+        if issues is None:
+            with instrumentation.span('fetch_issues'):
+                issues = self.fetch_issues()
+        for project in self.projects:
+            print('.', end='', flush=True)
+            project_issues = issues.get(project.project.id, [])
+            with instrumentation.span('IssueTree.build', issues=len(project_issues)):
+                project.issue_tree = IssueTree().build(project_issues, depth=depth)
+            if self.columns is None:
+                with instrumentation.span('walk', nodes=len(project.issue_tree.nodes)):
+                    self.walk(tree=project.issue_tree,
+                              project=project)
+        if self.columns is not None:
+            with instrumentation.span('walk_columns'):
+                self.walk_columns()
+        with instrumentation.span('IssueTree.aggregate', projects=len(self.projects)):
+            for project in self.projects:
+                project.issue_tree.aggregate()
+                project.issue_tables_gen = self.issue_tables(project)
+        print()
+
+    def project_tree(self) -> IssueTree:
+        """Build an IssueTree of the projects from their parent projects, nodes hold the time spent on the projects.
+
+        Projects are reordered so that every subproject follows its parent, like nodes in depth-first order.
+        Projects whose parent project is not visible become roots. Node totals include the time of subprojects.
+        """
+        tree = IssueTree().build((project.project.id,
+                                  project.name,
+                                  project.project.parent.id if hasattr(project.project, 'parent') else None)
+                                 for project in self.projects)
+        projects = {project.project.id: project for project in self.projects}
+        self.projects = [projects[node.issue_id] for node in tree.walk()]
+        for project in self.projects:
+            tree.nodes[project.project.id].store = project.time_entries
+        tree.aggregate()
+        return tree
+
+    def summary_table(self) -> list:
+        """Generate the table of the time spent on all projects and all their issues, issue trees must be filled."""
+        summary = defaultdict(partial(defaultdict, int))
         for project in self.projects:
-            project.issues = list(self.redmine.issue.filter(project_id=project.name,
-                                                            subproject_id='!*',  # Not in a subproject
-                                                            parent_id='!*',  # Is root
-                                                            status_id='*'))  # Get issues in any status
-            project.issue_tree = IssueTree()
-            for issue in project.issues:
-                print('.', end='', flush=True)
-                project.issue_tree = self.walk(tree=project.issue_tree,
-                                               issue_id=issue.id,
-                                               subject=issue.subject,
-                                               parent=None,
-                                               level=0,
-                                               project=project)
-            project.issue_tables_gen = ((root.subject,
-                                         self.gen_report_table(label='#' + str(root.issue_id), dictionary=root.store)
-                                         )
-                                         for root in project.issue_tree.roots
-                                         if root.store)  # If there are any time entries
-            print()
+            for part in [project.time_entries] + [root.total for root in project.issue_tree.roots]:
+                for user, activities in part.items():
+                    for activity, hours in activities.items():
+                        summary[user][activity] += hours
+        return self.gen_report_table(label=REPORT_MESSAGES['all_projects'][self.lang], dictionary=summary)
+
+    def release_time_entries(self):
+        """Drop the time entries once the projects and their issue trees hold the hours, before the report is written."""
+        self.project_entries = self.issue_entries = None
+        self.columns = self.resolved_activities = None
+        self.project_hours = self.issue_hours = None
+
+    def issue_tables(self, project, rollup=ISSUE_ROLLUP):
+        """Generate (subject, table) pairs for root issues of the project with any time entries.
+
+        rollup - include the time spent on subissues
+        """
+        for root in project.issue_tree.roots:
+            dictionary = root.total if rollup else root.store
+            if dictionary:  # If there are any time entries
+                yield root.subject, self.gen_report_table(label='#' + str(root.issue_id), dictionary=dictionary)
+
+    def get_project_issues(self, project) -> list:
+        """Get (issue id, subject, parent id) of all issues of the project."""
+        return self.fetch_json('/issues.json', 'issues', decode=decode_issues,
+                               project_id=project.project.id,
+                               subproject_id='!*',  # Not in a subproject
+                               status_id='*')  # Get issues in any status
 
     def gen_report_table(self, label, dictionary) -> list:
         """Generate reports table based on dictionary.
@@ -141,47 +386,67 @@ class RedmineManager:
                 row.append(round(dictionary[user][activity], 3) if activity in dictionary[user].keys() else 0)
             data.append(row)
             total = list(map(add, total, row[1:]))
-        table = [headers] + data + [[REPORT_MESSAGES['total'][LANG]] + total]
+        table = [headers] + data + [[REPORT_MESSAGES['total'][self.lang]] + total]
         return table
 
-    def walk(self, tree, issue_id, subject, parent, level, project) -> IssueTree:
-        """Walk the issue tree in Redmine constructing IssueTree object in the process.
+    def walk(self, tree, project, issue_entries=None) -> IssueTree:
+        """Walk the IssueTree adding time entries of every issue to its node.
 
         tree - IssueTree object
-        issue_id - id of the current issue
-        parent - parent IssueNode object
-        level - level up to which the tree needs to be constructed (root level is 0)
         project - RedmineProject object
+        issue_entries - {issue id: [time entries]} of the project, used instead of the index filled by get_time_entries
         """
-        node = tree.init_node(issue_id, subject, parent)
-        time_entries = self.redmine.time_entry.filter(issue_id=issue_id,
-                                                      from_date=self.from_date,
-                                                      to_date=self.to_date)
-        for entry in time_entries:
-            if entry.user.name in project.user_roles:  # This may be not the case if the user has been excluded from the project
-                set_of_roles = project.user_roles[entry.user.name]
-                resulting_activity = self.calculate_activity(set_of_roles, entry.activity.name)
-            else:
-                resulting_activity = entry.activity.name
-            node.add_data(user=entry.user.name,
-                          activity=resulting_activity,
-                          hours=entry.hours)
-        if node.level < level:
-            issues = self.redmine.issue.filter(parent_id=issue_id,
-                                               status_id='*')
-            for issue in issues:
-                self.walk(tree=tree,
-                          issue_id=issue.id,
-                          subject=issue.subject,
-                          parent=node,
-                          level=level,
-                          project=project)
+        overrides = self.resolver.project_overrides(project.project.id)
+        if self.issue_hours is not None:
+            for issue_id, node in tree.nodes.items():
+                for user, activity, hours in self.issue_hours.get(issue_id, []):
+                    node.add_data(user=user,
+                                  activity=overrides.get((user, activity), activity),
+                                  hours=hours)
+            return tree
+        issue_nodes = list(tree.nodes.items())
+        if issue_entries is not None:
+            time_entries = (issue_entries.get(issue_id, []) for issue_id, _ in issue_nodes)
+        elif self.issue_entries is None:  # Time entries of every issue are requested from Redmine
+            time_entries = self.parallel_map(lambda issue_node: list(self.issue_time_entries(issue_node[0])),
+                                             issue_nodes)
+        else:
+            time_entries = (self.issue_time_entries(issue_id) for issue_id, _ in issue_nodes)
+        for (_, node), node_entries in zip(issue_nodes, time_entries):
+            for entry in node_entries:
+                user, activity = entry.user.name, entry.activity.name
+                node.add_data(user=user,
+                              activity=overrides.get((user, activity), activity),
+                              hours=entry.hours)
         return tree
 
+    def walk_columns(self):
+        """Fill the nodes of all issue trees from the time entry columns with one vectorized group-by.
+
+        Time entries are grouped in the order walk adds them, issue by issue, so users come in the same order.
+        """
+        nodes = []
+        node_codes = {}  # IssueNode: code
+        issue_codes = {}  # Issue id: code of its node
+        issue_order = {}  # Issue id: position in the order walk visits issues
+        for project in self.projects:
+            for issue_id, node in project.issue_tree.nodes.items():
+                if node not in node_codes:  # Issues below ISSUE_TREE_DEPTH share the node of their ancestor
+                    node_codes[node] = len(nodes)
+                    nodes.append(node)
+                issue_codes[issue_id] = node_codes[node]
+                issue_order[issue_id] = len(issue_order)
+        tables = self.columns.group_sum(self.columns.map_values(self.columns.issue, issue_codes),
+                                        self.resolved_activities,
+                                        entry_order=self.columns.map_values(self.columns.issue, issue_order))
+        for code, table in tables.items():
+            nodes[code].store = table
+
     def calculate_activity(self, set_of_roles, activity) -> str:
         """Calculates the resulting activity depending on the role.
 
         settings.py contains ROLE_ACT_EXCEPTIONS, which enables override of some activities by others.
+        Time entries are resolved with the tables compiled from this function by compile_resolver.
         """
         allowed_activities = {self.role_act_map[(role, activity)] for role in set_of_roles}
         if activity in allowed_activities:
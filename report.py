@@ -2,10 +2,74 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab import rl_config
+from reportlab.pdfbase.pdfdoc import PDFArray, PDFName, PDFStream, PDFBase85Encode, PDFZCompress
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Frame, PageTemplate
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import inch
 from os import path
+import tempfile
+try:
+    from local_settings import *
+except ImportError:
+    from settings import *
+
+
+def register_fonts():
+    """Register fonts used in reports, once per process."""
+    if 'FreeSans' not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont('FreeSans', path.join('fonts', 'FreeSans.ttf')))
+
+
+class SpilledStream(PDFStream):
+    """Page content stream kept in a temporary file until the PDF is saved."""
+
+    def __init__(self, spill, content, compression):
+        super().__init__()
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        if compression:  # Encoded here like PDFPage does on save, the filters are marked as applied
+            filters = rl_config.useA85 and [PDFBase85Encode, PDFZCompress] or [PDFZCompress]
+            for stream_filter in reversed(filters):
+                content = stream_filter.encode(content)
+            if isinstance(content, str):  # ASCII85 produces text
+                content = content.encode('latin-1')
+            self.dictionary['Filter'] = PDFArray([PDFName(stream_filter.pdfname) for stream_filter in filters])
+        self.spill = spill
+        self.offset = spill.seek(0, 2)
+        self.length = spill.write(content)
+
+    def format(self, document):
+        self.spill.seek(self.offset)
+        self.content = self.spill.read(self.length)
+        try:
+            return super().format(document)
+        finally:
+            self.content = None
+
+
+class SpillingCanvas(Canvas):
+    """Canvas moving the content of every finished page to a temporary file.
+
+    reportlab writes the whole PDF on save(), until then only small page dictionaries stay in memory.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.spill = tempfile.TemporaryFile()
+
+    def showPage(self):
+        super().showPage()
+        page = self._doc.Pages.pages[-1]
+        page.Contents = SpilledStream(self.spill, page.stream, page.compression)
+        page.stream = None
+
+    def save(self):
+        try:
+            super().save()
+        finally:
+            self.spill.close()
 
 
 class Report:
@@ -19,6 +83,8 @@ class Report:
         self.table_style = None
         self.header_style = None
         self.text_style = None
+        self.contents_style = None
+        self.streaming = False
 
     def assign_styles(self):
         self.table_style = TableStyle([('ROWBACKGROUNDS', (0, 0), (-1, -1), [colors.aliceblue, colors.white]),
@@ -35,10 +101,19 @@ class Report:
                                         ('TEXTCOLOR', (0, 0), (-1, -1), colors.darkblue),
                                         ]
                                        )
+        self.contents_style = TableStyle([('FONT', (0, 0), (-1, -1), 'FreeSans', 9),
+                                          ('ALIGN', (1, 0), (1, -1), 'RIGHT'),  # Page numbers
+                                          ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.lightgrey),
+                                          ]
+                                         )
         self.text_style = getSampleStyleSheet()
 
-    def create(self, filename='redmine_report.pdf', pagesize=A4):
-        """Create report."""
+    def create(self, filename='redmine_report.pdf', pagesize=A4, stream=STREAM_REPORT):
+        """Create report.
+
+        stream - lay out every added element at once and move finished pages to a temporary file,
+                 instead of keeping all elements in memory until build()
+        """
         self.doc = SimpleDocTemplate(filename=filename,
                                      pagesize=pagesize,
                                      title='Redmine report',
@@ -47,24 +122,61 @@ class Report:
                                      topMargin=0.25*inch,
                                      bottomMargin=0.25*inch
                                      )
-        pdfmetrics.registerFont(TTFont('FreeSans', path.join('fonts', 'FreeSans.ttf')))
-        self.assign_styles()
+        register_fonts()
+        if self.table_style is None:  # Styles may have been assigned beforehand
+            self.assign_styles()
+        self.streaming = stream
+        if stream:
+            self.start_stream()
+
+    def start_stream(self):
+        """Start laying out the document the same way SimpleDocTemplate.build() does."""
+        doc = self.doc
+        frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal')
+        doc.addPageTemplates([PageTemplate(id='First', frames=frame, pagesize=doc.pagesize),
+                              PageTemplate(id='Later', frames=frame, pagesize=doc.pagesize)])
+        doc._startBuild(canvasmaker=SpillingCanvas)
+        doc.canv._doctemplate = doc
+
+    def add_element(self, element):
+        """Add a flowable to the report, laying it out right away when streaming."""
+        if not self.streaming:
+            self.elements.append(element)
+            return
+        flowables = [element]
+        while flowables:  # Parts of split elements are put back into the list
+            self.doc.clean_hanging()
+            self.doc.handle_flowable(flowables)
+
+    def start_section(self, title):
+        """Start a new section of the report. A single document needs no sections, see ParallelReport."""
+        pass
 
     def add_table(self, table):
         """Add new table to the report."""
         tb = Table(table, colWidths=[110] + [None] * (len(table[0]) - 1))
         tb.setStyle(self.table_style)
-        self.elements.append(tb)
+        self.add_element(tb)
 
     def add_header(self, header):
         """Add header table row."""
         hd = Table([[header]])
         hd.setStyle(self.header_style)
-        self.elements.append(hd)
+        self.add_element(hd)
+
+    def add_contents(self, entries):
+        """Add a table of contents, entries - list of (title, page number) pairs."""
+        tb = Table([[title, str(page)] for title, page in entries], colWidths=[None, 50])
+        tb.setStyle(self.contents_style)
+        self.add_element(tb)
 
     def build(self):
         """Write the report to disk."""
-        self.doc.build(self.elements)
+        if self.streaming:
+            del self.doc.canv._doctemplate
+            self.doc._endBuild()
+        else:
+            self.doc.build(self.elements)
 
     def add_text(self, text, header=None, space_after=None):
         """Add a new text paragraph."""
@@ -73,10 +185,10 @@ class Report:
         else:
             style = self.text_style['Heading' + str(header)]
         par = Paragraph('<font name="FreeSans">' + text + '</font>', style)
-        self.elements.append(par)
+        self.add_element(par)
         if space_after:
             self.add_space(num_inches=space_after)
 
     def add_space(self, num_inches=0.2):
         """Add empty vertical space."""
-        self.elements.append(Spacer(1, num_inches * inch))
+        self.add_element(Spacer(1, num_inches * inch))
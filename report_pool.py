@@ -0,0 +1,166 @@
+"""Module containing ParallelReport, rendering report sections in a process pool and merging them into one PDF.
+
+Used when RENDER_WORKERS > 1. Merging requires pypdf, only this module depends on it.
+Every part embeds its own copy of the fonts, identical copies are merged into one when the parts are merged.
+"""
+
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from os import path
+from pypdf import PdfReader, PdfWriter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.pdfgen.canvas import Canvas
+from report import Report, register_fonts
+try:
+    from local_settings import *
+except ImportError:
+    from settings import *
+
+_styles = None  # (table, header, contents, text) styles of a worker process, assigned once by init_worker()
+
+
+def init_worker():
+    """Register fonts and create report styles once per worker process."""
+    global _styles
+    register_fonts()
+    report = Report()
+    report.assign_styles()
+    _styles = report.table_style, report.header_style, report.contents_style, report.text_style
+
+
+def render_section(filename, calls, pagesize) -> int:
+    """Replay recorded Report calls into a PDF file and return its number of pages."""
+    report = Report()
+    report.table_style, report.header_style, report.contents_style, report.text_style = _styles
+    report.create(filename=filename, pagesize=pagesize)
+    for method, args, kwargs in calls:
+        getattr(report, method)(*args, **kwargs)
+    report.build()
+    return report.doc.canv.getPageNumber() - 1  # The canvas is already on the page after the last one
+
+
+class ParallelReport:
+    """Class ParallelReport with the interface of Report, rendering every section in a worker process.
+
+       Calls of add_* methods are recorded and a section is handed over to the pool when the next one starts,
+       so sections are rendered while the following ones are still being produced. build() merges the parts
+       in order behind a table of contents and numbers the pages.
+
+       workers - number of worker processes
+       lang - language of the table of contents
+       sections - list of (title, future of the number of pages, part filename)
+    """
+
+    def __init__(self, workers=RENDER_WORKERS, lang=LANG):
+        self.workers = workers
+        self.lang = lang
+        self.executor = None
+        self.directory = None
+        self.filename = None
+        self.pagesize = None
+        self.sections = []
+        self.title = None
+        self.calls = []
+        self.streaming = True  # Added elements do not stay in the main process
+
+    def create(self, filename='redmine_report.pdf', pagesize=A4):
+        """Create report."""
+        self.filename = filename
+        self.pagesize = pagesize
+        self.directory = tempfile.mkdtemp(prefix='redmine_report_')
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker)
+
+    def start_section(self, title):
+        """Start a new section, listed in the table of contents under title."""
+        self.submit()
+        self.title = title
+
+    def submit(self):
+        """Hand the current section over to the pool."""
+        if self.calls:
+            filename = path.join(self.directory, 'part{}.pdf'.format(len(self.sections)))
+            future = self.executor.submit(render_section, filename, self.calls, self.pagesize)
+            self.sections.append((self.title, future, filename))
+        self.calls = []
+
+    def record(self, method, *args, **kwargs):
+        self.calls.append((method, args, kwargs))
+
+    def add_table(self, table):
+        """Add new table to the report."""
+        self.record('add_table', table)
+
+    def add_header(self, header):
+        """Add header table row."""
+        self.record('add_header', header)
+
+    def add_text(self, text, header=None, space_after=None):
+        """Add a new text paragraph."""
+        self.record('add_text', text, header=header, space_after=space_after)
+
+    def add_space(self, num_inches=0.2):
+        """Add empty vertical space."""
+        self.record('add_space', num_inches=num_inches)
+
+    def build(self):
+        """Wait for all sections, merge them and write the report to disk."""
+        self.submit()
+        try:
+            page_counts = [future.result() for _, future, _ in self.sections]
+            contents, start_pages = self.render_contents(page_counts)
+            writer = PdfWriter()
+            writer.append(PdfReader(contents))
+            for _, _, filename in self.sections:
+                writer.append(filename)
+            for (title, _, _), start_page in zip(self.sections, start_pages):
+                if title:
+                    writer.add_outline_item(title, start_page - 1)  # Bookmark, pypdf counts pages from 0
+            self.number_pages(writer)
+            writer.compress_identical_objects()  # Fonts of all parts
+            writer.write(self.filename)
+        finally:
+            self.executor.shutdown()
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def render_contents(self, page_counts) -> tuple:
+        """Render the table of contents, return (PDF in memory, first page number of every section).
+
+        Page numbers include the contents themselves, so they are rendered again until their length settles.
+        """
+        contents_pages = 1
+        while True:
+            start_pages, page = [], contents_pages + 1
+            for count in page_counts:
+                start_pages.append(page)
+                page += count
+            contents = BytesIO()
+            report = Report()
+            report.create(filename=contents, pagesize=self.pagesize, stream=False)
+            report.add_text(text=REPORT_MESSAGES['contents'][self.lang], header=1, space_after=0.1)
+            report.add_contents([(title, start_page) for (title, _, _), start_page in zip(self.sections, start_pages)
+                                 if title])
+            report.build()
+            num_pages = report.doc.canv.getPageNumber() - 1
+            if num_pages == contents_pages:
+                contents.seek(0)
+                return contents, start_pages
+            contents_pages = num_pages
+
+    def number_pages(self, writer):
+        """Stamp 'page / total' at the bottom of every page. Stamped pages get their contents compressed again."""
+        total = len(writer.pages)
+        overlay = BytesIO()
+        canvas = Canvas(overlay, pagesize=self.pagesize)
+        for number in range(1, total + 1):
+            canvas.setFont('FreeSans', 7)
+            canvas.setFillColor(colors.grey)
+            canvas.drawRightString(self.pagesize[0] - 0.6 * inch, 0.1 * inch, '{} / {}'.format(number, total))
+            canvas.showPage()
+        canvas.save()
+        for page, stamp in zip(writer.pages, PdfReader(overlay).pages):
+            page.merge_page(stamp)
+            page.compress_content_streams()
@@ -0,0 +1,215 @@
+"""Module containing ReportService, a long-running HTTP server generating reports with a warm RedmineManager.
+
+Usage: python service.py, then GET http://SERVICE_HOST:SERVICE_PORT/report?from=2026-01-01&to=2026-01-31&format=csv
+format is one of 'pdf', 'csv', 'ndjson', 'xlsx' and defaults to OUTPUT_FORMAT, the dates to the last NUM_DAYS days.
+"""
+
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from os import path
+from urllib.parse import urlsplit, parse_qsl
+try:
+    from local_settings import *
+except ImportError:
+    from settings import *
+from main import create_report, get_project_time, write_report
+from redmine_manager import RedmineManager
+
+CONTENT_TYPES = {'pdf': 'application/pdf',
+                 'csv': 'text/csv; charset=utf-8',
+                 'ndjson': 'application/x-ndjson; charset=utf-8',
+                 'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'}
+
+
+class ResultCache:
+    """Class ResultCache for keeping generated reports in memory up to max_bytes, least recently used go first."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.items = OrderedDict()  # Key: bytes, most recently used last
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.items.get(key)
+            if data is not None:
+                self.items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:  # Would evict everything else and still not fit
+            return
+        with self.lock:
+            if key in self.items:
+                self.size -= len(self.items.pop(key))
+            self.items[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                self.size -= len(self.items.popitem(last=False)[1])
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.size = 0
+
+
+class ReportService:
+    """Class ReportService for generating reports on request without reconnecting and reloading reference data.
+
+       rmman - warm RedmineManager with roles, activities and projects, replaced on every refresh
+       results - ResultCache of generated reports
+       inflight - {(from_date, to_date, format): Future} of reports being generated, identical requests wait for it
+       generation - number of refreshes so far, results of an older generation are not cached
+    """
+
+    def __init__(self, url=REDMINE_URL, api_key=REDMINE_KEY, refresh_minutes=SERVICE_REFRESH,
+                 cache_bytes=SERVICE_CACHE_MB * 2**20, cache_path=CACHE_PATH):
+        self.url = url
+        self.api_key = api_key
+        self.cache_path = cache_path
+        self.refresh_minutes = refresh_minutes
+        self.rmman = None
+        self.results = ResultCache(cache_bytes)
+        self.inflight = {}
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.refresher = None
+        self.server = None
+
+    def start(self):
+        """Connect to Redmine, load reference data and start refreshing it in the background."""
+        rmman = RedmineManager()
+        rmman.connect(url=self.url, api_key=self.api_key, cache_path=self.cache_path)
+        self.load_reference(rmman)
+        self.refresher = threading.Thread(target=self.refresh_loop, name='reference-refresh', daemon=True)
+        self.refresher.start()
+        return self
+
+    def load_reference(self, rmman, refresh=False):
+        """Make rmman the warm manager once it has reference data, refetched from Redmine if refresh is set."""
+        rmman.get_roles(refresh=refresh)
+        rmman.get_projects(refresh=refresh)
+        with self.lock:
+            self.rmman = rmman
+            self.generation += 1
+        self.results.clear()
+
+    def refresh(self):
+        """Replace the warm manager by one with reference data fetched from Redmine, bypassing the cache TTL."""
+        self.load_reference(self.rmman.spawn(reference=False), refresh=True)
+
+    def refresh_loop(self):
+        while not self.stopped.wait(self.refresh_minutes * 60):
+            try:
+                self.refresh()
+            except Exception as error:  # Keep serving with the reference data loaded before
+                print('Refreshing reference data failed: {}'.format(error))
+
+    def report(self, from_date, to_date, output_format) -> bytes:
+        """Get the report, generating it unless it is cached or being generated for an identical request."""
+        key = (from_date, to_date, output_format)
+        data = self.results.get(key)
+        if data is not None:
+            return data
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is not None:
+                owner = False
+            else:
+                owner = True
+                future = self.inflight[key] = Future()
+            rmman, generation = self.rmman, self.generation
+        if not owner:
+            return future.result()
+        try:
+            data = self.generate(rmman, from_date, to_date, output_format)
+            if generation == self.generation:
+                self.results.put(key, data)
+            future.set_result(data)
+            return data
+        except Exception as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self.lock:
+                del self.inflight[key]
+
+    @staticmethod
+    def generate(warm_rmman, from_date, to_date, output_format) -> bytes:
+        """Generate a report with a RedmineManager spawned from the warm one, return the contents of its file."""
+        rmman = warm_rmman.spawn()
+        rmman.set_time_interval(from_date=from_date, to_date=to_date)
+        get_project_time(rmman)
+        with tempfile.TemporaryDirectory(prefix='redmine_service_') as directory:
+            filename = path.join(directory, 'report.' + output_format)
+            report = create_report(filename=filename, output_format=output_format, lang=rmman.lang)
+            write_report(report, rmman)
+            with open(filename, 'rb') as file:
+                return file.read()
+
+    def serve(self, host=SERVICE_HOST, port=SERVICE_PORT):
+        """Create the HTTP server, serve_forever() or shutdown() it via self.server."""
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        return self.server
+
+    def stop(self):
+        self.stopped.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path != '/report':
+                    return self.respond(404, b'Not found')
+                params = dict(parse_qsl(url.query))
+                output_format = params.get('format', OUTPUT_FORMAT)
+                try:
+                    to_date = date.fromisoformat(params['to']) if 'to' in params else date.today()
+                    from_date = (date.fromisoformat(params['from']) if 'from' in params
+                                 else to_date - timedelta(days=NUM_DAYS))
+                except ValueError as error:
+                    return self.respond(400, str(error).encode('utf-8'))
+                if output_format not in CONTENT_TYPES or from_date > to_date:
+                    return self.respond(400, b'Unknown format or empty time interval')
+                try:
+                    data = service.report(from_date, to_date, output_format)
+                except Exception as error:
+                    return self.respond(500, str(error).encode('utf-8'))
+                self.respond(200, data, CONTENT_TYPES[output_format])
+
+            def respond(self, status, body, content_type='text/plain; charset=utf-8'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == '__main__':
+    report_service = ReportService().start()
+    print('Serving reports on http://{}:{}/report'.format(SERVICE_HOST, SERVICE_PORT))
+    try:
+        report_service.serve().serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        report_service.stop()
@@ -22,6 +22,103 @@ SUPPRESS_WARNINGS = True
 # certifi or other modules can be imported to specify this
 CERT_PATH = ''
 
+# Fetch all time entries of the time period in one paginated sweep and route them to projects and issues in memory.
+# If False, time entries are requested separately for every project and every issue.
+BULK_FETCH = True
+
+# Number of resources requested per page. Redmine caps it at 100 unless its API limit has been changed.
+FETCH_PAGE_SIZE = 100
+
+# Maximum number of simultaneous requests to Redmine. Connections are kept alive and shared between them.
+FETCH_WORKERS = 8
+
+# Requests answered with 429 (Too Many Requests) or 5xx are retried with exponential backoff:
+# FETCH_BACKOFF * 2 ** (retry number - 1) seconds between the attempts.
+FETCH_RETRIES = 3
+FETCH_BACKOFF = 0.5
+
+# Fetch and aggregate with AsyncRedmineManager (requires aiohttp): pages of all projects are fetched concurrently
+# (at most FETCH_WORKERS requests at a time) and every project is written into the report as soon as it is complete.
+# CACHE_PATH and AGGREGATION_BACKEND are not used in this mode.
+ASYNC_FETCH = False
+
+# Seconds a request may take with ASYNC_FETCH before it is retried like a failed one.
+FETCH_TIMEOUT = 60
+
+# Path to a local SQLite database that keeps Redmine resources between runs. Later runs fetch only issues and time entries
+# updated since the previous run. Empty string disables the cache.
+CACHE_PATH = ''
+
+# Roles, activities, projects and memberships kept in the cache are fetched again when older than this number of hours.
+CACHE_REFERENCE_TTL = 24
+
+# Ignore the contents of the cache and fetch everything again, refilling the cache.
+CACHE_FULL_REFRESH = False
+
+# Seconds to wait for another process or service request writing to the cache before giving up.
+CACHE_LOCK_TIMEOUT = 30
+
+# Keep hours summed up by day, week, month and year in the cache, updated as time entries change.
+# Reports then add up a few of these buckets instead of reading all time entries of the period.
+CACHE_AGGREGATES = True
+
+# Instance-wide report: time entries and issues of all projects are fetched in one pass each (as with BULK_FETCH),
+# a summary of the time spent on all projects comes first and projects are listed as a hierarchy,
+# every subproject after its parent project. Not used with ASYNC_FETCH.
+INSTANCE_REPORT = False
+
+# With INSTANCE_REPORT, show the time spent on every project together with the time spent on its subprojects.
+PROJECT_ROLLUP = False
+
+# Depth of the issue hierarchy kept in memory, root issues have level 0. None keeps the whole hierarchy.
+# Otherwise time spent on deeper issues is added to their ancestor at this depth.
+ISSUE_TREE_DEPTH = None
+
+# Show the time spent on root issues together with all their subissues. If False, only the time logged
+# on the root issues themselves is shown.
+ISSUE_ROLLUP = True
+
+# How time entries are summed up: 'dict' (plain Python) or 'numpy' (columnar arrays and vectorized group-by,
+# requires NumPy). 'numpy' applies only when all time entries are fetched at once, i.e. with BULK_FETCH or the cache,
+# and decodes them straight into the arrays. batch.py always uses 'dict', its time entries are decoded already.
+AGGREGATION_BACKEND = 'dict'
+
+# Lay out report elements as soon as they are added and keep finished pages in a temporary file, so memory does not
+# grow with the number of tables. If False, all elements are kept in memory and laid out when the report is built.
+STREAM_REPORT = True
+
+# Report format: 'pdf', or machine-readable 'csv', 'ndjson' (newline-delimited JSON) and 'xlsx' (requires openpyxl)
+# with one record per user and activity of every table. The extension of FILENAME is replaced accordingly.
+OUTPUT_FORMAT = 'pdf'
+
+# Number of processes rendering the report. With more than 1, every project becomes a section rendered in its own
+# process, the sections are merged behind a table of contents and the pages are numbered (requires pypdf).
+RENDER_WORKERS = 1
+
+# Number of processes generating the reports of a batch (python batch.py specs.json). None uses all CPU cores.
+BATCH_WORKERS = None
+
+# Address the report service (python service.py) listens on
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8080
+
+# Minutes between reloads of roles, activities and projects. Generated reports are dropped on every reload.
+SERVICE_REFRESH = 60
+
+# Memory for generated reports kept to answer repeated requests, in megabytes. Least recently used are dropped first.
+SERVICE_CACHE_MB = 256
+
+# File the profile of a run is written to: timings of every phase, processed items, HTTP requests by endpoint.
+# Empty string disables profiling.
+PROFILE_PATH = ''
+
+# Format of the profile: 'json' (summary) or 'chrome' (trace for chrome://tracing or https://ui.perfetto.dev)
+PROFILE_FORMAT = 'json'
+
+# Trace peak memory of every phase with tracemalloc as well. Slows the run down noticeably.
+# Peaks are per phase on Python 3.9+ only, on older versions a phase gets the peak of the run so far.
+PROFILE_MEMORY = False
+
 # Dictionary of activity override settings (depending on the role)
 # Example of key-value pair: ('Developer', 'Testing'): 'Development'
 ROLE_ACT_EXCEPTIONS = {}
@@ -48,10 +145,20 @@ REPORT_MESSAGES = {'resource_info': {'RU': 'Информация по ресур
                                      'EN': 'Information about resources for time period: {} to {}'},
                    'project_spent_time': {'RU': 'Время, затраченное на проекты в целом (задача не указана):',
                                           'EN': 'Time spent on projects (issue not specified)'},
+                   'project_rollup_spent_time': {'RU': 'Время, затраченное на проекты вместе с подпроектами '
+                                                       '(задача не указана):',
+                                                 'EN': 'Time spent on projects and their subprojects '
+                                                       '(issue not specified)'},
+                   'instance_spent_time': {'RU': 'Суммарное время, затраченное на все проекты и задачи:',
+                                           'EN': 'Total time spent on all projects and issues'},
+                   'all_projects': {'RU': 'Все проекты',
+                                    'EN': 'All projects'},
                    'root_issues_spent_time': {'RU': 'Суммарное время, затраченное на корневые задачи по проектам:',
                                               'EN': 'Total time spent on project''s root issues'},
                    'project': {'RU': 'Проект',
                                'EN': 'Project'},
+                   'contents': {'RU': 'Содержание',
+                                'EN': 'Contents'},
                    'total': {'RU': 'Всего: ',
                              'EN': 'Total: '},
                    }
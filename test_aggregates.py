@@ -0,0 +1,122 @@
+"""Tests of cover() and HourBuckets against sums of raw time entries. Run with python -m unittest."""
+
+import random
+import unittest
+from collections import defaultdict
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from aggregates import HourBuckets, bucket_end, bucket_start, cover
+from cache import RedmineCache
+from fake_redmine import generate_data
+
+FIRST_DAY = date(2027, 1, 1)  # 500 days reach the leap day of 2028
+BOUNDARIES = [(date(2027, 1, 22), date(2027, 1, 31)),  # Last week of a month, 10 days long
+              (date(2027, 2, 22), date(2027, 2, 28)),  # ... of February
+              (date(2028, 2, 22), date(2028, 2, 29)),  # ... of February in a leap year
+              (date(2028, 2, 1), date(2028, 2, 29)),
+              (date(2028, 2, 29), date(2028, 2, 29)),
+              (date(2027, 2, 28), date(2027, 3, 1)),
+              (date(2027, 12, 22), date(2028, 1, 7)),  # Year rollover
+              (date(2027, 1, 1), date(2027, 12, 31)),
+              (date(2027, 3, 15), date(2028, 3, 14))]
+
+
+class TestCover(unittest.TestCase):
+
+    def assertCoversExactly(self, from_date, to_date):
+        """Buckets of cover() are whole buckets, adjacent and spanning exactly [from_date, to_date]."""
+        day = from_date
+        for level, start in cover(from_date, to_date):
+            self.assertEqual(start, day)
+            self.assertEqual(bucket_start(level, start), start)
+            day = bucket_end(level, start) + timedelta(days=1)
+        self.assertEqual(day, to_date + timedelta(days=1))
+
+    def test_last_week_of_month(self):
+        self.assertEqual(cover(date(2027, 1, 22), date(2027, 1, 31)), [('week', date(2027, 1, 22))])
+        self.assertEqual(cover(date(2027, 2, 22), date(2027, 2, 28)), [('week', date(2027, 2, 22))])
+        self.assertEqual(cover(date(2027, 1, 22), date(2027, 1, 30))[0], ('day', date(2027, 1, 22)))
+
+    def test_leap_day(self):
+        self.assertEqual(cover(date(2028, 2, 22), date(2028, 2, 29)), [('week', date(2028, 2, 22))])
+        self.assertEqual(cover(date(2028, 2, 1), date(2028, 2, 29)), [('month', date(2028, 2, 1))])
+        self.assertEqual(cover(date(2028, 2, 29), date(2028, 2, 29)), [('day', date(2028, 2, 29))])
+
+    def test_year_rollover(self):
+        self.assertEqual(cover(date(2027, 12, 22), date(2028, 1, 7)),
+                         [('week', date(2027, 12, 22)), ('week', date(2028, 1, 1))])
+        self.assertEqual(cover(date(2027, 1, 1), date(2027, 12, 31)), [('year', date(2027, 1, 1))])
+
+    def test_exact_cover(self):
+        rnd = random.Random(0)
+        intervals = [sorted(FIRST_DAY + timedelta(days=rnd.randrange(800)) for _ in range(2)) for _ in range(200)]
+        for from_date, to_date in BOUNDARIES + intervals:
+            with self.subTest(from_date=from_date, to_date=to_date):
+                self.assertCoversExactly(from_date, to_date)
+
+
+class TestHourBuckets(unittest.TestCase):
+    """Bucket sums equal raw sums, also after days rolled up already are edited, moved and deleted."""
+
+    def setUp(self):
+        self.data = generate_data(num_projects=3, num_users=5, issues_per_project=5, num_entries=300,
+                                  from_date=FIRST_DAY, num_days=500)
+        self.cache = RedmineCache(SimpleNamespace(url='test'), path=':memory:')
+        with self.cache.transaction():
+            self.cache.store_time_entries(self.data['time_entries'])
+        self.buckets = HourBuckets(self.cache)
+        self.buckets.update()
+        rnd = random.Random(0)
+        self.intervals = BOUNDARIES + [sorted(FIRST_DAY + timedelta(days=rnd.randrange(500)) for _ in range(2))
+                                       for _ in range(30)]
+
+    def raw_hours(self, from_date, to_date) -> dict:
+        hours = defaultdict(float)
+        for entry in self.cache.time_entries(from_date, to_date):
+            hours[(entry['project']['id'], entry.get('issue', {}).get('id', 0),
+                   entry['user']['name'], entry['activity']['name'])] += entry['hours']
+        return hours
+
+    def assertSumsEqual(self):
+        for from_date, to_date in self.intervals:
+            with self.subTest(from_date=from_date, to_date=to_date):
+                raw = self.raw_hours(from_date, to_date)
+                summed = {tuple(row[:4]): row[4] for row in self.buckets.hours(from_date, to_date)}
+                self.assertEqual(raw.keys(), summed.keys())
+                for key, value in raw.items():
+                    self.assertAlmostEqual(value, summed[key])
+
+    def store(self, entries):
+        with self.cache.transaction():
+            self.cache.store_time_entries(entries)
+        self.buckets.update()
+
+    def test_initial(self):
+        self.assertSumsEqual()
+
+    def test_edit(self):
+        entries = self.data['time_entries'][::50]
+        for entry in entries:
+            entry['hours'] += 0.5
+        self.store(entries)
+        self.assertSumsEqual()
+
+    def test_move(self):
+        # One step at a time, so no step hides another
+        for entry, day in zip(self.data['time_entries'][::60], ['2027-01-31', '2027-07-01', '2028-01-01',
+                                                                '2028-02-29', '2027-02-28']):
+            entry['spent_on'] = day
+            self.store([entry])
+            self.assertSumsEqual()
+
+    def test_delete(self):
+        for entry in self.data['time_entries'][::70]:
+            with self.cache.transaction():
+                self.cache.delete_time_entries('WHERE id = ?', (entry['id'],))
+            self.buckets.update()
+            self.assertSumsEqual()
+
+
+if __name__ == '__main__':
+    unittest.main()
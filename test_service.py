@@ -0,0 +1,74 @@
+"""Tests of ReportService against FakeRedmine. Run with python -m unittest."""
+
+import csv
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import date
+from io import StringIO
+
+from fake_redmine import FakeRedmine, generate_data
+from service import ReportService
+
+
+def total_hours(csv_report) -> float:
+    """Sum hours of the project tables of a CSV report, time spent on the project itself and on its issues."""
+    return sum(float(row['hours']) for row in csv.DictReader(StringIO(csv_report)) if row['hours'])
+
+
+class TestRefresh(unittest.TestCase):
+    """Reference data changed in Redmine shows up after a refresh, even when the cache holds it."""
+
+    def test_refresh_bypasses_cache(self):
+        data = generate_data(num_projects=3, num_users=4, issues_per_project=5, num_entries=50)
+        with FakeRedmine(data) as fake, tempfile.TemporaryDirectory() as directory, redirect_stdout(StringIO()):
+            service = ReportService(url=fake.url, api_key='test', refresh_minutes=60,
+                                    cache_path=os.path.join(directory, 'cache.sqlite')).start()
+            try:
+                self.assertNotIn('Renamed project', [project.project.name for project in service.rmman.projects])
+                data['projects'][0]['name'] = 'Renamed project'
+                for role in [data['roles'][0]] + [role for memberships in data['memberships'].values()
+                                                  for membership in memberships for role in membership['roles']
+                                                  if role['id'] == data['roles'][0]['id']]:
+                    role['name'] = 'Renamed role'
+                service.refresh()
+                self.assertIn('Renamed project', [project.project.name for project in service.rmman.projects])
+                self.assertIn('Renamed role', service.rmman.roles)
+                self.assertEqual(service.generation, 2)
+            finally:
+                service.stop()
+
+    def test_renamed_user_and_activity(self):
+        for cached in (False, True):
+            with self.subTest(cached=cached):
+                self.check_renamed_user_and_activity(cached)
+
+    def check_renamed_user_and_activity(self, cached):
+        data = generate_data(num_projects=3, num_users=4, issues_per_project=5, num_entries=50)
+        with FakeRedmine(data) as fake, tempfile.TemporaryDirectory() as directory, redirect_stdout(StringIO()):
+            service = ReportService(url=fake.url, api_key='test', refresh_minutes=60,
+                                    cache_path=os.path.join(directory, 'cache.sqlite') if cached else '').start()
+            try:
+                before = service.report(date(2026, 1, 1), date(2026, 3, 31), 'csv').decode('utf-8')
+                data['activities'][0]['name'] = 'Renamed activity'
+                for entry in data['time_entries']:
+                    if entry['user']['id'] == 2:
+                        entry['user']['name'] = 'Renamed user'
+                    if entry['activity']['id'] == data['activities'][0]['id']:
+                        entry['activity']['name'] = 'Renamed activity'
+                    entry['updated_on'] = '2099-01-01T00:00:00Z'
+                fake._filtered.clear()
+                service.refresh()
+                after = service.report(date(2026, 1, 1), date(2026, 3, 31), 'csv').decode('utf-8')
+                self.assertIn('User 2', before)
+                self.assertNotIn('User 2', after)
+                self.assertIn('Renamed user', after)
+                self.assertIn('Renamed activity', after)
+                self.assertAlmostEqual(total_hours(before), total_hours(after))  # No hours dropped
+            finally:
+                service.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()